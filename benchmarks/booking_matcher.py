@@ -0,0 +1,93 @@
+"""
+Benchmark: prompt size and local latency of booking pre-filtering.
+
+Compares the CANCEL_MEETING_PROMPT built from every upcoming booking against
+the prompt built from the candidates chosen by select_candidates.
+
+Run with:
+    python -m benchmarks.booking_matcher
+"""
+from datetime import datetime, timedelta, timezone
+import random
+import time
+
+from calcom_chatbot.prompts.templates import CANCEL_MEETING_PROMPT
+from calcom_chatbot.utils.booking_matcher import select_candidates, format_bookings_text
+
+try:
+    import tiktoken
+    _encoding = tiktoken.encoding_for_model("gpt-4")
+except Exception:
+    # tiktoken missing, or its encoding file cannot be downloaded
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is None:
+        # Rough approximation: ~4 characters per token
+        return len(text) // 4
+    return len(_encoding.encode(text))
+
+
+SIZES = [10, 50, 100, 250, 500, 1000]
+REPEATS = 50
+
+FIRST_NAMES = ["Alice", "Bob", "Carol", "David", "Emma", "Frank", "Grace", "Henry", "Ivy", "John"]
+LAST_NAMES = ["Smith", "Chen", "Garcia", "Kumar", "Lee", "Martin", "Novak", "Olsen", "Park", "Wang"]
+TITLES = ["Intro call", "Project sync", "Design review", "1:1", "Interview", "Demo"]
+
+
+def make_bookings(count: int, now: datetime) -> list:
+    """Generate synthetic upcoming bookings in chronological order."""
+    rng = random.Random(count)
+    bookings = []
+    start = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    for i in range(count):
+        start += timedelta(minutes=rng.choice([30, 60, 90, 120, 240]))
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        bookings.append({
+            "uid": f"bk{i:06d}",
+            "title": f"{rng.choice(TITLES)} between Host and {name}",
+            "start": start.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "attendees": [{"name": name, "email": f"{name.split()[0].lower()}@example.com"}],
+        })
+    return bookings
+
+
+def build_prompt(user_query: str, bookings_text: str, now: datetime) -> str:
+    return CANCEL_MEETING_PROMPT.format(
+        conversation_history="",
+        user_query=user_query,
+        bookings_text=bookings_text,
+        current_time=now.isoformat()
+    )
+
+
+def main():
+    now = datetime.now(timezone.utc)
+    print(f"{'bookings':>8} | {'full tokens':>11} | {'filtered tokens':>15} | {'candidates':>10} | {'filter ms':>9}")
+    print("-" * 66)
+
+    for size in SIZES:
+        bookings = make_bookings(size, now)
+        target = bookings[size // 2]
+        attendee = target["attendees"][0]["name"]
+        start = datetime.fromisoformat(target["start"].replace("Z", "+00:00"))
+        user_query = f"cancel my meeting with {attendee} on {start.date().isoformat()}"
+
+        full_text = format_bookings_text(bookings, len(bookings))
+        full_tokens = count_tokens(build_prompt(user_query, full_text, now))
+
+        began = time.perf_counter()
+        for _ in range(REPEATS):
+            candidates = select_candidates(bookings, user_query, now=now)
+        filter_ms = (time.perf_counter() - began) * 1000 / REPEATS
+
+        filtered_text = format_bookings_text(candidates, len(bookings))
+        filtered_tokens = count_tokens(build_prompt(user_query, filtered_text, now))
+
+        print(f"{size:>8} | {full_tokens:>11} | {filtered_tokens:>15} | {len(candidates):>10} | {filter_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,32 @@ from calcom_chatbot.nodes.cancel_meeting import cancel_meeting_node
 from calcom_chatbot.nodes.reschedule_meeting import reschedule_meeting_node
 from calcom_chatbot.nodes.orchestrator import orchestrator_node
 from calcom_chatbot.nodes.response import response_node
+from calcom_chatbot.utils.metrics import NODE_LATENCY
+from calcom_chatbot.utils.profiler import span
+import asyncio
+import time
+
+
+def timed(name: str, node):
+    """Wrap a node (sync or async) to record its latency histogram and, when profiling, a span."""
+    if asyncio.iscoroutinefunction(node):
+        async def run_async(state: AgentState) -> AgentState:
+            start = time.perf_counter()
+            try:
+                with span(name, "node"):
+                    return await node(state)
+            finally:
+                NODE_LATENCY.observe(time.perf_counter() - start, node=name)
+        return run_async
+    
+    def run(state: AgentState) -> AgentState:
+        start = time.perf_counter()
+        try:
+            with span(name, "node"):
+                return node(state)
+        finally:
+            NODE_LATENCY.observe(time.perf_counter() - start, node=name)
+    return run
 
 
 def route_by_intent(state: AgentState) -> str:
@@ -33,14 +59,14 @@ def route_by_intent(state: AgentState) -> str:
 
 graph = StateGraph(AgentState)
 
-graph.add_node("classifier", classifier_node)
-graph.add_node("book_meeting", book_meeting_node)
-graph.add_node("list_events", list_events_node)
-graph.add_node("get_slots", get_slots_node)
-graph.add_node("cancel_meeting", cancel_meeting_node)
-graph.add_node("reschedule_meeting", reschedule_meeting_node)
-graph.add_node("orchestrator", orchestrator_node)
-graph.add_node("response", response_node)
+graph.add_node("classifier", timed("classifier", classifier_node))
+graph.add_node("book_meeting", timed("book_meeting", book_meeting_node))
+graph.add_node("list_events", timed("list_events", list_events_node))
+graph.add_node("get_slots", timed("get_slots", get_slots_node))
+graph.add_node("cancel_meeting", timed("cancel_meeting", cancel_meeting_node))
+graph.add_node("reschedule_meeting", timed("reschedule_meeting", reschedule_meeting_node))
+graph.add_node("orchestrator", timed("orchestrator", orchestrator_node))
+graph.add_node("response", timed("response", response_node))
 
 graph.add_edge(START, "classifier")
 graph.add_conditional_edges("classifier", route_by_intent, {
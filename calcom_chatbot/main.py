@@ -1,17 +1,39 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from calcom_chatbot.graph import compiled_graph
 from calcom_chatbot.state import AgentState
-from calcom_chatbot.utils.config import setup_langsmith
+from calcom_chatbot.utils.config import (
+    setup_langsmith,
+    get_calcom_webhook_secret,
+    get_admin_token,
+    get_loop_block_threshold,
+    get_turn_deadline,
+    get_session_coalesce_window
+)
+from calcom_chatbot.tools.booking_sync import booking_sync_worker, full_resync
+from calcom_chatbot.tools.webhooks import verify_signature, apply_webhook_event
+from calcom_chatbot.utils.llm_metrics import llm_metrics_handler
+from calcom_chatbot.utils.loop_monitor import loop_lag_monitor
+from calcom_chatbot.utils.metrics import registry, ACTIVE_SESSIONS
+from calcom_chatbot.utils.profiler import profiled, profile_store, server_timing
+from calcom_chatbot.utils.log_config import setup_logging
+from calcom_chatbot.utils.admission import AdmissionRejected, admission_controller, session_rate_limiter
+from calcom_chatbot.utils.streaming import FINAL_ANSWER_TAG
+from calcom_chatbot.utils.prompt_stats import prompt_stats
+from calcom_chatbot.utils.model_router import turn_budget
+from calcom_chatbot.utils.idempotency import DEFAULT_SESSION_ID
 import uvicorn
 import traceback
 import logging
+import json
+import hmac
 from datetime import datetime, timedelta
 import asyncio
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (JSON, written from a background thread)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Setup LangSmith tracing
@@ -27,12 +49,24 @@ app = FastAPI(
 
 class ChatRequest(BaseModel):
     message: str
-    session_id: Optional[str] = "default"
+    session_id: Optional[str] = DEFAULT_SESSION_ID
+    idempotency_key: Optional[str] = None  # Reuse when retrying the same message
+
+
+class BatchItem(ChatRequest):
+    id: Optional[str] = None  # Echoed back so results can be matched to inputs
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    concurrency: int = 4  # Sessions processed at once
 
 
 class ChatResponse(BaseModel):
     response: str
     intent: Optional[str] = None
+    profile_id: Optional[str] = None  # Only for profiled requests
+    profile: Optional[Dict[str, Any]] = None
 
 
 # In-memory session storage with TTL (Time To Live)
@@ -70,6 +104,7 @@ async def cleanup_expired_sessions():
         ]
         for sid in expired_sessions:
             del sessions[sid]
+        session_rate_limiter.prune(SESSION_TTL.total_seconds())
         if expired_sessions:
             logger.info(f"Cleaned up {len(expired_sessions)} expired sessions")
 
@@ -79,47 +114,255 @@ async def startup_event():
     """启动时启动后台清理任务"""
     asyncio.create_task(cleanup_expired_sessions())
     logger.info("Started background session cleanup task")
+    booking_sync_worker.start()
+    logger.info("Started background bookings sync")
+    loop_lag_monitor.start(threshold=get_loop_block_threshold())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers."""
+    await booking_sync_worker.stop()
+    await loop_lag_monitor.stop()
+
+
+def require_admin(http_request: Request):
+    """Reject the request unless it carries the configured admin token."""
+    token = get_admin_token()
+    supplied = http_request.headers.get("X-Admin-Token", "")
+    if not token or not hmac.compare_digest(supplied, token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def profiling_requested(http_request: Request, profile: bool) -> bool:
+    """Whether this request asked to be profiled (X-Profile: 1 or ?profile=true); admin only."""
+    if not (profile or http_request.headers.get("X-Profile", "").lower() in ("1", "true")):
+        return False
+    require_admin(http_request)
+    return True
+
+
+def overloaded(e: AdmissionRejected) -> HTTPException:
+    """503 (server busy) or 429 (session over its rate limit), with Retry-After."""
+    status_code = 429 if e.reason == "session_rate" else 503
+    detail = "Too many messages, slow down" if status_code == 429 else "Server busy, try again shortly"
+    return HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(e.retry_after)})
+
+
+class SessionMailbox:
+    """
+    Queue of one session's turns.
+    
+    Turns run one at a time in arrival order, so two quick messages can't read
+    the same history and overwrite each other's replies. With coalescing on,
+    messages that pile up while a turn is running (or arrive within the
+    coalesce window) are answered by a single graph run.
+    """
+    
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending: List[Tuple[ChatRequest, asyncio.Future]] = []
+        self.waiters = 0
+
+
+# session_id -> mailbox, only while the session has turns queued or running
+mailboxes: Dict[str, SessionMailbox] = {}
+
+# Receives streamed turn events (node finished, progress events from nodes, reply tokens)
+EventSink = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+async def stream_graph(initial_state: AgentState, config: Dict[str, Any], on_event: EventSink) -> Dict[str, Any]:
+    """
+    Run the graph, passing events to on_event; returns the final state.
+    
+    Events are each finished node, each progress event from nodes, and the
+    tokens of LLM calls that write the reply (tagged FINAL_ANSWER_TAG).
+    """
+    result: Dict[str, Any] = dict(initial_state)
+    stream_mode = ["values", "updates", "custom", "messages"]
+    async for mode, chunk in compiled_graph.astream(initial_state, config=config, stream_mode=stream_mode):
+        if mode == "values":
+            result = chunk
+        elif mode == "updates":
+            for node in chunk:
+                await on_event({"type": "node", "node": node})
+        elif mode == "messages":
+            message, metadata = chunk
+            if message.content and FINAL_ANSWER_TAG in (metadata.get("tags") or []):
+                await on_event({"type": "token", "text": message.content})
+        else:
+            await on_event(chunk)
+    return result
+
+
+async def run_turn(
+    session_id: str,
+    user_messages: List[str],
+    idempotency_key: Optional[str] = None,
+    on_event: Optional[EventSink] = None
+) -> Dict[str, Any]:
+    """
+    Run one graph turn for a session and save it to the history.
+    
+    Several user messages (coalesced) are answered together. Callers must hold
+    the session's mailbox (see submit_turn). With on_event, node progress is
+    streamed to it while the turn runs.
+    
+    Raises:
+        AdmissionRejected: If the turn is shed by admission control
+    """
+    # Get existing messages (or empty list if new/expired); copied so a shed turn leaves history untouched
+    messages = list(get_session_messages(session_id))
+    
+    # Add user messages
+    messages.extend(f"User: {message}" for message in user_messages)
+    
+    # Prepare initial state
+    initial_state: AgentState = {
+        "messages": messages.copy(),
+        "user_query": "\n".join(user_messages),
+        "intent": None,
+        "booking_details": None,
+        "api_response": None,
+        "final_response": "",
+        "session_id": session_id,
+        "idempotency_key": idempotency_key
+    }
+    
+    # Invoke the graph
+    config = {"callbacks": [llm_metrics_handler]}
+    async with admission_controller.admit(get_turn_deadline()):
+        # Model routing downgrades LLM calls as the turn's latency/cost budget runs out
+        with turn_budget():
+            if on_event is None:
+                result = await compiled_graph.ainvoke(initial_state, config=config)
+            else:
+                result = await stream_graph(initial_state, config, on_event)
+    
+    # Add assistant response
+    messages.append(f"Assistant: {result['final_response']}")
+    
+    # Save messages with updated timestamp
+    update_session_messages(session_id, messages)
+    return result
+
+
+async def submit_turn(request: ChatRequest, on_event: Optional[EventSink] = None) -> Dict[str, Any]:
+    """
+    Queue a message behind the session's earlier turns and return the graph result that answers it.
+    
+    Progress goes to on_event only if this request's own turn runs the graph
+    (not when it was coalesced into an earlier message's turn).
+    """
+    mailbox = mailboxes.setdefault(request.session_id, SessionMailbox())
+    mailbox.waiters += 1
+    try:
+        window = get_session_coalesce_window()
+        if window <= 0:
+            async with mailbox.lock:
+                return await run_turn(request.session_id, [request.message], request.idempotency_key, on_event)
+        
+        future = asyncio.get_running_loop().create_future()
+        mailbox.pending.append((request, future))
+        try:
+            async with mailbox.lock:
+                if not future.done():
+                    # Let rapid follow-ups join this run
+                    await asyncio.sleep(window)
+                    batch, mailbox.pending = mailbox.pending, []
+                    if len(batch) > 1:
+                        logger.info(f"📨 Coalescing {len(batch)} messages for session {request.session_id}")
+                    try:
+                        result = await run_turn(
+                            request.session_id,
+                            [queued.message for queued, _ in batch],
+                            batch[-1][0].idempotency_key,
+                            on_event
+                        )
+                    except Exception as e:
+                        for _, other in batch:
+                            if other is not future:
+                                other.set_exception(e)
+                        raise
+                    except BaseException:
+                        # Cancelled: hand the other messages to the next turn in line
+                        mailbox.pending[:0] = [item for item in batch if item[1] is not future]
+                        raise
+                    for _, other in batch:
+                        if other is not future:
+                            other.set_result(result)
+                    return result
+        except asyncio.CancelledError:
+            if not future.done():
+                # Cancelled before a turn took this message: it must not be answered (or saved) by the next one
+                mailbox.pending[:] = [item for item in mailbox.pending if item[1] is not future]
+            raise
+        # Answered by a turn run on behalf of an earlier message
+        return future.result()
+    finally:
+        mailbox.waiters -= 1
+        if mailbox.waiters == 0:
+            mailboxes.pop(request.session_id, None)
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest) -> ChatResponse:
+async def chat(request: ChatRequest, http_request: Request, http_response: Response, profile: bool = False) -> ChatResponse:
     """
     Main chat endpoint.
     
     Accepts a user message and returns the chatbot's response.
     Sessions auto-expire after 1 hour of inactivity.
+    
+    A session's messages are answered one at a time, in order; with
+    SESSION_COALESCE_MS set, messages sent in quick succession get one
+    combined reply.
+    
+    Admins can profile a request (X-Profile: 1 or ?profile=true, plus X-Admin-Token):
+    the span tree comes back in the response, is stored under profile_id, and
+    is summarized in the Server-Timing header.
+    
+    Under load, turns wait for a free slot (MAX_CONCURRENT_TURNS); when the
+    queue is full or a turn couldn't finish within TURN_DEADLINE_SECONDS it
+    gets 503 with Retry-After. A session sending faster than its rate limit
+    gets 429.
     """
+    profiling = profiling_requested(http_request, profile)
+    
     try:
-        # Get existing messages (or empty list if new/expired)
-        messages = get_session_messages(request.session_id)
-        
-        # Add user message
-        messages.append(f"User: {request.message}")
-        
-        # Prepare initial state
-        initial_state: AgentState = {
-            "messages": messages.copy(),
-            "user_query": request.message,
-            "intent": None,
-            "booking_details": None,
-            "api_response": None,
-            "final_response": ""
-        }
-        
-        # Invoke the graph
-        result = await compiled_graph.ainvoke(initial_state)
-        
-        # Add assistant response
-        messages.append(f"Assistant: {result['final_response']}")
-        
-        # Save messages with updated timestamp
-        update_session_messages(request.session_id, messages)
+        session_rate_limiter.check(request.session_id)
+    except AdmissionRejected as e:
+        logger.warning(f"⏳ Session {request.session_id} rate limited (retry after {e.retry_after}s)")
+        raise overloaded(e)
+    
+    try:
+        profile_id = None
+        profile_data = None
+        if profiling:
+            with profiled("chat") as root:
+                result = await submit_turn(request)
+            profile_id = profile_store.add(
+                root,
+                session_id=request.session_id,
+                message=request.message[:200],
+                intent=result.get("intent")
+            )
+            profile_data = profile_store.get(profile_id)["spans"]
+            http_response.headers["Server-Timing"] = server_timing(root)
+        else:
+            result = await submit_turn(request)
         
         return ChatResponse(
             response=result["final_response"],
-            intent=result.get("intent")
+            intent=result.get("intent"),
+            profile_id=profile_id,
+            profile=profile_data
         )
     
+    except AdmissionRejected as e:
+        logger.warning(f"⏳ Shedding chat turn ({e.reason}, retry after {e.retry_after}s)")
+        raise overloaded(e)
+    
     except Exception as e:
         # Log the full traceback for debugging
         logger.error(f"Error processing chat request: {str(e)}")
@@ -127,6 +370,190 @@ async def chat(request: ChatRequest) -> ChatResponse:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """
+    Chat with the reply streamed as NDJSON events.
+    
+    Same turn handling as /chat. Lines are {"type": "node"} as nodes finish,
+    progress events from nodes (e.g. orchestrator "plan" and "task"),
+    {"type": "token"} pieces of the reply as the LLM writes it, then
+    {"type": "final"} with the full reply or {"type": "error"}.
+    """
+    try:
+        session_rate_limiter.check(request.session_id)
+    except AdmissionRejected as e:
+        logger.warning(f"⏳ Session {request.session_id} rate limited (retry after {e.retry_after}s)")
+        raise overloaded(e)
+    
+    async def events() -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def answer():
+            try:
+                result = await submit_turn(request, on_event=queue.put)
+                await queue.put({"type": "final", "response": result["final_response"], "intent": result.get("intent")})
+            except AdmissionRejected as e:
+                await queue.put({"type": "error", "status": overloaded(e).status_code, "retry_after": e.retry_after})
+            except Exception as e:
+                logger.error(f"Error processing streamed chat request: {str(e)}")
+                logger.error(traceback.format_exc())
+                await queue.put({"type": "error", "status": 500, "detail": f"Error: {str(e)}"})
+        
+        task = asyncio.create_task(answer())
+        try:
+            while True:
+                event = await queue.get()
+                yield json.dumps(event) + "\n"
+                if event["type"] in ("final", "error"):
+                    break
+        finally:
+            # Client went away: stop the turn
+            task.cancel()
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+# Limits for POST /chat/batch
+MAX_BATCH_ITEMS = 1000
+MAX_BATCH_CONCURRENCY = 16
+BATCH_MAX_ATTEMPTS = 3  # Per item, when shed by admission control
+
+
+async def answer_batch_item(index: int, item: BatchItem) -> Dict[str, Any]:
+    """Run one batch item as a turn; waits and retries when shed, and reports errors instead of raising."""
+    entry = {"index": index, "id": item.id, "session_id": item.session_id}
+    for attempt in range(BATCH_MAX_ATTEMPTS):
+        try:
+            result = await submit_turn(item)
+            return {**entry, "status": 200, "response": result["final_response"], "intent": result.get("intent")}
+        except AdmissionRejected as e:
+            if attempt + 1 == BATCH_MAX_ATTEMPTS:
+                return {**entry, "status": 503, "error": "Server busy", "retry_after": e.retry_after}
+            await asyncio.sleep(e.retry_after)
+        except Exception as e:
+            logger.error(f"Error processing batch item {index}: {str(e)}")
+            logger.error(traceback.format_exc())
+            return {**entry, "status": 500, "error": f"Error: {str(e)}"}
+
+
+async def run_batch(items: List[BatchItem], concurrency: int) -> AsyncIterator[str]:
+    """
+    Answer batch items as NDJSON lines, in the order they finish.
+    
+    Sessions run concurrently (up to `concurrency` at once); each session's
+    items run one after another in their original order.
+    """
+    by_session: Dict[str, List[Tuple[int, BatchItem]]] = {}
+    for index, item in enumerate(items):
+        by_session.setdefault(item.session_id, []).append((index, item))
+    
+    results: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def run_session(turns: List[Tuple[int, BatchItem]]):
+        async with semaphore:
+            for index, item in turns:
+                await results.put(await answer_batch_item(index, item))
+    
+    tasks = [asyncio.create_task(run_session(turns)) for turns in by_session.values()]
+    failed = 0
+    try:
+        for _ in items:
+            line = await results.get()
+            failed += line["status"] != 200
+            yield json.dumps(line) + "\n"
+        yield json.dumps({"done": True, "succeeded": len(items) - failed, "failed": failed}) + "\n"
+    finally:
+        # Client went away: stop the remaining turns
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/chat/batch")
+async def chat_batch(batch: BatchRequest, http_request: Request) -> StreamingResponse:
+    """
+    Run many (session_id, message) items, e.g. replayed conversations or evaluation sets (admin only).
+    
+    Independent sessions run concurrently and share the process-wide caches;
+    turns within a session keep their order and history. Results stream back
+    as NDJSON, one line per item as it finishes, then a summary line.
+    Per-session rate limits don't apply; turns still go through admission
+    control and are retried when shed.
+    """
+    require_admin(http_request)
+    if len(batch.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {MAX_BATCH_ITEMS})")
+    concurrency = max(1, min(batch.concurrency, MAX_BATCH_CONCURRENCY))
+    logger.info(f"📦 Running batch of {len(batch.items)} items (concurrency {concurrency})")
+    return StreamingResponse(run_batch(batch.items, concurrency), media_type="application/x-ndjson")
+
+
+def parse_ws_message(text: str) -> Dict[str, Any]:
+    """A WebSocket frame is either plain message text or a JSON object ({"message": ...} or {"type": "cancel"})."""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return {"message": text}
+    return data if isinstance(data, dict) else {"message": text}
+
+
+@app.websocket("/ws/chat")
+async def ws_chat(websocket: WebSocket, session_id: str = DEFAULT_SESSION_ID):
+    """
+    Chat over one WebSocket connection bound to a session (?session_id=...).
+    
+    Each incoming message starts a turn; the server sends {"type": "node"}
+    and node progress events while the graph runs, then {"type": "final"}
+    with the reply. Every event carries the turn number. Sending a new
+    message (or {"type": "cancel"}) while a turn is running cancels it; a
+    cancelled turn is not saved to the history.
+    """
+    await websocket.accept()
+    turn = 0
+    running: Optional[asyncio.Task] = None
+    
+    async def answer(request: ChatRequest, turn: int):
+        async def send(event: Dict[str, Any]):
+            await websocket.send_json({**event, "turn": turn})
+        
+        try:
+            result = await submit_turn(request, on_event=send)
+            await send({"type": "final", "response": result["final_response"], "intent": result.get("intent")})
+        except AdmissionRejected as e:
+            await send({"type": "error", "status": overloaded(e).status_code, "retry_after": e.retry_after})
+        except Exception as e:
+            logger.error(f"Error processing WebSocket turn: {str(e)}")
+            logger.error(traceback.format_exc())
+            await send({"type": "error", "status": 500, "detail": f"Error: {str(e)}"})
+    
+    try:
+        while True:
+            data = parse_ws_message(await websocket.receive_text())
+            
+            if running is not None and not running.done():
+                running.cancel()
+                logger.info(f"🛑 Cancelled turn {turn} of session {session_id}")
+                await websocket.send_json({"type": "cancelled", "turn": turn})
+            if data.get("type") == "cancel" or not data.get("message"):
+                continue
+            
+            turn += 1
+            try:
+                session_rate_limiter.check(session_id)
+            except AdmissionRejected as e:
+                await websocket.send_json({"type": "error", "status": 429, "retry_after": e.retry_after, "turn": turn})
+                continue
+            
+            request = ChatRequest(message=data["message"], session_id=session_id, idempotency_key=data.get("idempotency_key"))
+            running = asyncio.create_task(answer(request, turn))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if running is not None:
+            running.cancel()
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -136,6 +563,83 @@ async def root():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: node, LLM and Cal.com latencies, cache hits, sessions, loop lag."""
+    ACTIVE_SESSIONS.set(len(sessions))
+    loop_lag_monitor.export()
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/loop")
+async def debug_loop(http_request: Request):
+    """Event-loop lag percentiles and recent blocking stalls with stacks (admin only)."""
+    require_admin(http_request)
+    return loop_lag_monitor.report()
+
+
+@app.get("/debug/prompts")
+async def debug_prompts(http_request: Request):
+    """Prompt sizes per template (static prefix, average, budget trims) and cached-token ratio per node (admin only)."""
+    require_admin(http_request)
+    return prompt_stats.report()
+
+
+@app.get("/profiles")
+async def list_profiles(http_request: Request):
+    """List stored request profiles, newest first (admin only)."""
+    require_admin(http_request)
+    return {"profiles": profile_store.list()}
+
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, http_request: Request):
+    """Get the span tree of a profiled request (admin only)."""
+    require_admin(http_request)
+    stored = profile_store.get(profile_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return stored
+
+
+@app.post("/webhooks/calcom")
+async def calcom_webhook(request: Request):
+    """
+    Ingest Cal.com booking webhooks (BOOKING_CREATED / CANCELLED / RESCHEDULED).
+    
+    Keeps the local bookings mirror and availability cache current without polling.
+    """
+    secret = get_calcom_webhook_secret()
+    if not secret:
+        raise HTTPException(status_code=503, detail="Webhooks not configured (CALCOM_WEBHOOK_SECRET missing)")
+    
+    body = await request.body()
+    if not verify_signature(body, request.headers.get("X-Cal-Signature-256"), secret):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    if not isinstance(event, dict):
+        raise HTTPException(status_code=400, detail="Webhook payload must be a JSON object")
+    
+    applied = apply_webhook_event(event)
+    return {"status": "applied" if applied else "ignored"}
+
+
+@app.post("/bookings/resync")
+async def resync_bookings(http_request: Request):
+    """Rebuild the local bookings mirror from Cal.com (admin only)."""
+    require_admin(http_request)
+    try:
+        count = await full_resync()
+    except Exception as e:
+        logger.error(f"Bookings resync failed: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Resync failed: {str(e)}")
+    return {"message": "Bookings resynced", "bookings": count}
+
+
 @app.get("/sessions/{session_id}")
 async def get_session(session_id: str):
     """Get conversation history for a session (if not expired)."""
@@ -1,34 +1,87 @@
-from langchain_openai import ChatOpenAI
 from calcom_chatbot.state import AgentState
 from calcom_chatbot.tools.cal_api import create_booking
-from calcom_chatbot.utils.config import get_openai_api_key
+from calcom_chatbot.utils.idempotency import idempotency_cache, idempotency_key, idempotency_scope
+from calcom_chatbot.utils.config import get_default_timezone, get_calcom_event_length
+from calcom_chatbot.utils.booking_index import find_conflicts, format_conflicts
+from calcom_chatbot.utils.slot_cache import SlotUnavailableError
+from calcom_chatbot.utils.date_resolver import local_to_utc, resolve_datetime, WEEKDAYS, MONTHS
+from calcom_chatbot.utils.model_router import ainvoke_routed
 from calcom_chatbot.prompts.templates import BOOK_MEETING_PROMPT
+from datetime import datetime, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
 import re
 
 
+# Capitalized words after "with" that are part of a date, not the attendee's name
+NAME_STOPWORDS = {"at", "on", "today", "tomorrow", "tonight", "next", "this", "in"} | set(WEEKDAYS) | set(MONTHS)
+
+
+def resolve_booking_locally(user_query: str) -> Optional[str]:
+    """
+    Build a BOOKING_READY line without the LLM when the message has every field.
+
+    The date and time are resolved to UTC (from a timezone in the message or
+    DEFAULT_TIMEZONE), so the line says timezone=UTC. Returns None when
+    anything is missing or ambiguous, so the LLM can ask.
+    """
+    if user_query.startswith("BOOKING_READY:"):
+        # Already structured (e.g. from the orchestrator)
+        return user_query
+
+    resolved = resolve_datetime(user_query, default_timezone=get_default_timezone())
+    email_match = re.search(r'[\w.+-]+@[\w-]+\.[\w.-]*\w', user_query)
+    name_match = re.search(r"\bwith\s+([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)*)", user_query)
+    if not (resolved["date"] and resolved["time"] and email_match and name_match):
+        return None
+
+    name_parts = []
+    for part in name_match.group(1).split():
+        if part.lower() in NAME_STOPWORDS:
+            break
+        name_parts.append(part)
+    if not name_parts:
+        return None
+
+    line = f"BOOKING_READY: date={resolved['date']}, time={resolved['time']}, timezone=UTC, name={' '.join(name_parts)}, email={email_match.group(0)}"
+    notes_match = re.search(r'\b(?:reason|notes?)\s*[:=]\s*(.+)$', user_query, re.IGNORECASE | re.DOTALL)
+    if notes_match:
+        line += f", notes={notes_match.group(1).strip()}"
+    return line
+
+
+def is_well_formed(response_text: str) -> bool:
+    """False for a BOOKING_READY line missing a field (retried on a stronger model)."""
+    if not response_text.startswith("BOOKING_READY:"):
+        return True
+    return all(re.search(pattern, response_text) for pattern in (
+        r'date=(\d{4}-\d{2}-\d{2})', r'time=(\d{2}:\d{2})', r'name=([^,]+)', r'email=([^\s,]+)'
+    ))
+
+
 async def book_meeting_node(state: AgentState) -> AgentState:
     """Handle booking meeting flow."""
     user_query = state["user_query"]
     messages = state.get("messages", [])
     
-    llm = ChatOpenAI(
-        api_key=get_openai_api_key(),
-        model="gpt-4",
-        temperature=0
-    )
-    
-    # Build conversation history
-    conversation_history = "\n".join(messages[-5:]) if messages else ""
-    
-    # Let LLM handle all user interaction
-    prompt = BOOK_MEETING_PROMPT.format(
-        conversation_history=conversation_history,
-        user_query=user_query
-    )
-
     try:
-        response = llm.invoke(prompt)
-        response_text = response.content.strip()
+        # Skip the LLM round-trip when the message already has every detail
+        response_text = resolve_booking_locally(user_query)
+
+        if response_text is None:
+            # Build conversation history
+            conversation_history = "\n".join(messages[-5:]) if messages else ""
+
+            # Let LLM handle all user interaction
+            prompt = BOOK_MEETING_PROMPT.render(
+                conversation_history=conversation_history,
+                user_query=user_query,
+                timezone=get_default_timezone(),
+                current_time=datetime.now(ZoneInfo(get_default_timezone())).isoformat()
+            )
+
+            response = await ainvoke_routed("book_meeting", prompt, accept=is_well_formed, hedge=True)
+            response_text = response.content.strip()
         
         # Only check if ready to book, otherwise return LLM's message
         if response_text.startswith("BOOKING_READY:"):
@@ -38,6 +91,8 @@ async def book_meeting_node(state: AgentState) -> AgentState:
             name_match = re.search(r'name=([^,]+)', response_text)
             email_match = re.search(r'email=([^\s,]+)', response_text)
             notes_match = re.search(r'notes=(.+?)(?:,|$)', response_text, re.DOTALL)
+            # date/time are on this timezone's wall clock; the LLM writes the user's (DEFAULT_TIMEZONE)
+            zone_match = re.search(r'timezone=([\w/+-]+)', response_text)
             
             if all([date_match, time_match, name_match, email_match]):
                 date = date_match.group(1)
@@ -46,17 +101,33 @@ async def book_meeting_node(state: AgentState) -> AgentState:
                 email = email_match.group(1).strip()
                 notes = notes_match.group(1).strip() if notes_match else ""
                 
-                # Execute booking
-                start_time = f"{date}T{time}:00Z"
-                result = await create_booking(
-                    start_time=start_time,
-                    attendee_email=email,
-                    attendee_name=name,
-                    notes=notes
-                )
+                start = local_to_utc(date, time, zone_match.group(1) if zone_match else get_default_timezone())
+                start_time = start.strftime("%Y-%m-%dT%H:%M:%SZ")
+                # Confirm on the user's clock, with the zone spelled out
+                local_start = start.astimezone(ZoneInfo(get_default_timezone()))
+                when = f"{local_start:%Y-%m-%d} at {local_start:%H:%M} ({get_default_timezone()})"
+                # Same session (or client key), time and attendee -> same booking
+                scope = idempotency_scope(state.get("idempotency_key"), state.get("session_id"))
+                write_key = idempotency_key(scope, "create", start_time, email) if scope else None
                 
-                state["api_response"] = result
-                state["final_response"] = f"✅ Successfully booked your meeting for {date} at {time}. Confirmation sent to {email}."
+                # Reject known collisions locally instead of waiting for Cal.com
+                # (a repeated write would otherwise collide with its own booking)
+                repeated = write_key is not None and idempotency_cache.seen(write_key)
+                conflicts = [] if repeated else find_conflicts(start_time, get_calcom_event_length())
+                if conflicts:
+                    state["final_response"] = f"❌ {when} conflicts with {format_conflicts(conflicts)}. Try a different time or date."
+                else:
+                    # Execute booking
+                    result = await create_booking(
+                        start_time=start_time,
+                        attendee_email=email,
+                        attendee_name=name,
+                        notes=notes,
+                        idempotency_key=write_key
+                    )
+                    
+                    state["api_response"] = result
+                    state["final_response"] = f"✅ Successfully booked your meeting for {when}. Confirmation sent to {email}."
             else:
                 # Parsing failed, let LLM handle it
                 state["final_response"] = response_text
@@ -64,6 +135,9 @@ async def book_meeting_node(state: AgentState) -> AgentState:
             # LLM is handling user interaction (asking for info, clarifying, etc.)
             state["final_response"] = response_text
         
+    except SlotUnavailableError as e:
+        # Rejected locally from cached availability, with nearby alternatives
+        state["final_response"] = f"❌ {e}"
     except Exception as e:
         error_msg = str(e)
         if "past" in error_msg.lower():
@@ -1,54 +1,52 @@
-from langchain_openai import ChatOpenAI
 from calcom_chatbot.state import AgentState
-from calcom_chatbot.tools.cal_api import list_bookings, cancel_booking
-from calcom_chatbot.utils.config import get_openai_api_key, get_calcom_user_email
+from calcom_chatbot.tools.booking_sync import get_upcoming_bookings, find_bookings
+from calcom_chatbot.tools.cal_api import cancel_booking
+from calcom_chatbot.utils.config import get_default_timezone
+from calcom_chatbot.utils.booking_filters import filters_from_query
+from calcom_chatbot.utils.booking_matcher import select_candidates, format_bookings_text
+from calcom_chatbot.utils.model_router import ainvoke_routed
 from calcom_chatbot.prompts.templates import CANCEL_MEETING_PROMPT
 from datetime import datetime, timezone
 import re
 
 
+def is_well_formed(response_text: str) -> bool:
+    """False for a CANCEL_READY line missing the booking or reason (retried on a stronger model)."""
+    if not response_text.startswith("CANCEL_READY:"):
+        return True
+    return bool(re.search(r'booking_uid=([a-zA-Z0-9]+)', response_text) and re.search(r'reason=(.+?)(?:,|$)', response_text, re.DOTALL))
+
+
 async def cancel_meeting_node(state: AgentState) -> AgentState:
     """Handle canceling meeting flow."""
     user_query = state["user_query"]
     messages = state.get("messages", [])
     
-    llm = ChatOpenAI(
-        api_key=get_openai_api_key(),
-        model="gpt-4",
-        temperature=0
-    )
-    
     # Build conversation history
     conversation_history = "\n".join(messages[-5:]) if messages else ""
     
     try:
-        # Get all upcoming bookings
-        user_email = get_calcom_user_email()
-        bookings = await list_bookings(user_email)
-        
-        # Format bookings for LLM
-        bookings_info = []
-        for booking in bookings:
-            booking_uid = booking.get("uid")
-            title = booking.get("title", "Meeting")
-            start = booking.get("start", "")
-            attendees = booking.get("attendees", [])
-            attendee_names = ", ".join([a.get("name", "Unknown") for a in attendees])
-            bookings_info.append(
-                f"UID: {booking_uid}, Title: {title}, Start: {start}, Attendees: {attendee_names}"
-            )
+        # Narrow to the bookings the message names (date, attendee) before
+        # matching; fall back to every upcoming booking if nothing matches
+        filters = filters_from_query(user_query, default_timezone=get_default_timezone())
+        filters.pop("status", None)
+        bookings = await find_bookings(filters) if filters else []
+        if not bookings:
+            bookings = await get_upcoming_bookings()
         
-        bookings_text = "\n".join(bookings_info) if bookings else "No upcoming bookings"
+        # Only send the bookings the request most likely refers to
+        candidates = select_candidates(bookings, user_query, conversation_history)
+        bookings_text = format_bookings_text(candidates, len(bookings))
         
         # Let LLM handle all user interaction
-        prompt = CANCEL_MEETING_PROMPT.format(
+        prompt = CANCEL_MEETING_PROMPT.render(
             conversation_history=conversation_history,
             user_query=user_query,
             bookings_text=bookings_text,
             current_time=datetime.now(timezone.utc).isoformat()
         )
 
-        response = llm.invoke(prompt)
+        response = await ainvoke_routed("cancel_meeting", prompt, accept=is_well_formed, hedge=True)
         response_text = response.content.strip()
         
         # Only check if ready to cancel, otherwise return LLM's message
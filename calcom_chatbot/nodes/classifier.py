@@ -1,52 +1,31 @@
-from langchain_openai import ChatOpenAI
+from typing import Any, Dict, List, Optional, Tuple
 from calcom_chatbot.state import AgentState
-from calcom_chatbot.prompts.templates import INTENT_CLASSIFICATION_PROMPT
-from calcom_chatbot.utils.config import get_openai_api_key
+from calcom_chatbot.prompts.templates import INTENT_CLASSIFICATION_PROMPT, INTENT_BATCH_CLASSIFICATION_PROMPT
+from calcom_chatbot.utils.config import (
+    get_classifier_batching,
+    get_classifier_batch_max_size,
+    get_classifier_batch_max_wait
+)
+from calcom_chatbot.utils.llm_metrics import llm_metrics_handler
+from calcom_chatbot.utils.metrics import CLASSIFIER_BATCH_SIZE
+from calcom_chatbot.utils.micro_batch import MicroBatcher
+from calcom_chatbot.utils.hedging import LLMDeadlineExceeded
+from calcom_chatbot.utils.model_router import ainvoke_routed, escalation_tier, select_tier
+import asyncio
+import json
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+VALID_INTENTS = ["book_meeting", "list_events", "get_slots", "cancel_meeting", "reschedule_meeting", "multi_step", "general"]
 
-def classifier_node(state: AgentState) -> AgentState:
-    """Classify user intent."""
-    user_query = state["user_query"]
-    messages = state.get("messages", [])
-    
-    # Pre-check: Force multi_step for batch operations (failsafe)
-    query_lower = user_query.lower()
-    batch_keywords = [
-        ("cancel", ["all", "both", "every"]),
-        ("reschedule", ["all", "both", "every"]),
-        ("book", ["multiple", "two", "three", "several", "few"])
-    ]
-    
-    for action, keywords in batch_keywords:
-        if action in query_lower:
-            if any(keyword in query_lower for keyword in keywords):
-                # Definitely a batch operation
-                state["intent"] = "multi_step"
-                state["confidence"] = 1.0
-                logger.info(f" Classification: intent=multi_step, confidence=1.00, query='{user_query[:50]}...' (batch keyword detected)")
-                return state
-    
-    llm = ChatOpenAI(
-        api_key=get_openai_api_key(),
-        model="gpt-4",
-        temperature=0
-    )
-    
-    # Build conversation history for context
-    conversation_history = "\n".join(messages[-3:]) if messages else "No previous conversation"
-    
-    # Use conversation history to better classify intent
-    prompt = INTENT_CLASSIFICATION_PROMPT.format(
-        user_query=user_query,
-        conversation_history=conversation_history
-    )
-    response = llm.invoke(prompt)
-    response_text = response.content.strip().lower()
-    
-    # Parse intent and confidence score
+# Below this an intent isn't acted on (and the classification is retried on a stronger model)
+CONFIDENCE_THRESHOLD = 0.6
+
+
+def parse_classification(response_text: str) -> Tuple[str, float]:
+    """Parse "intent:confidence" into (intent, confidence); unknown or low-confidence intents become general."""
     # Expected format: "intent:confidence_score" (e.g., "book_meeting:0.95")
     intent = "general"
     confidence = 0.0
@@ -58,10 +37,9 @@ def classifier_node(state: AgentState) -> AgentState:
             confidence = float(parts[1].strip())
             
             # Validate intent
-            valid_intents = ["book_meeting", "list_events", "get_slots", "cancel_meeting", "reschedule_meeting", "multi_step", "general"]
-            if predicted_intent in valid_intents:
+            if predicted_intent in VALID_INTENTS:
                 # Check confidence threshold
-                if confidence >= 0.6:
+                if confidence >= CONFIDENCE_THRESHOLD:
                     intent = predicted_intent
                 else:
                     # Low confidence - default to general
@@ -70,7 +48,7 @@ def classifier_node(state: AgentState) -> AgentState:
                 intent = "general"
         else:
             # Fallback: old format without confidence
-            if response_text in ["book_meeting", "list_events", "get_slots", "cancel_meeting", "reschedule_meeting", "multi_step", "general"]:
+            if response_text in VALID_INTENTS:
                 intent = response_text
             else:
                 intent = "general"
@@ -78,6 +56,116 @@ def classifier_node(state: AgentState) -> AgentState:
         # Parsing error - default to general
         intent = "general"
     
+    return intent, confidence
+
+
+def is_confident(response_text: str) -> bool:
+    return parse_classification(response_text.lower())[1] >= CONFIDENCE_THRESHOLD
+
+
+async def classify(
+    user_query: str,
+    conversation_history: str,
+    config: Optional[Dict[str, Any]] = None,
+    tier: Optional[str] = None
+) -> Tuple[str, float]:
+    """Classify one message with its own LLM call, escalating to a stronger model on low confidence."""
+    # Use conversation history to better classify intent
+    prompt = INTENT_CLASSIFICATION_PROMPT.render(
+        user_query=user_query,
+        conversation_history=conversation_history
+    )
+    response = await ainvoke_routed("classifier", prompt, accept=is_confident, config=config, tier=tier, hedge=True)
+    return parse_classification(response.content.strip().lower())
+
+
+async def classify_batch(items: List[Tuple[str, str]]) -> List[Tuple[str, float]]:
+    """
+    Classify several (user_query, conversation_history) items with one LLM call.
+    
+    Items the batched reply doesn't cover (or can't be parsed) are classified
+    one by one; low-confidence answers are retried on a stronger model.
+    """
+    CLASSIFIER_BATCH_SIZE.observe(len(items))
+    # Runs outside any graph run, so metrics are attached here
+    config = {"callbacks": [llm_metrics_handler], "metadata": {"langgraph_node": "classifier"}}
+    if len(items) == 1:
+        return [await classify(*items[0], config=config)]
+    
+    # One JSON object per line: message text can't break out of its conversation
+    conversations = "\n".join(
+        json.dumps({"id": i, "conversation_history": history, "latest_user_message": query}, ensure_ascii=False)
+        for i, (query, history) in enumerate(items, 1)
+    )
+    prompt = INTENT_BATCH_CLASSIFICATION_PROMPT.render(conversations=conversations)
+    tier = select_tier("classifier")
+    response = await ainvoke_routed("classifier", prompt, config=config, tier=tier, hedge=True)
+    
+    results = {}
+    try:
+        match = re.search(r"\[.*\]", response.content, re.DOTALL)
+        for entry in json.loads(match.group(0)) if match else []:
+            results[int(entry["id"])] = parse_classification(f"{str(entry['intent']).lower()}:{entry['confidence']}")
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"⚠️ Could not parse batched classification: {e}")
+    
+    missing = [i for i in range(1, len(items) + 1) if i not in results]
+    if missing:
+        logger.warning(f"⚠️ Batched classification missed {len(missing)} of {len(items)} messages, classifying them individually")
+        for i, result in zip(missing, await asyncio.gather(*(classify(*items[i - 1], config=config) for i in missing))):
+            results[i] = result
+    
+    unsure = [i for i, (_, confidence) in results.items() if confidence < CONFIDENCE_THRESHOLD and i not in missing]
+    stronger = escalation_tier("classifier", tier) if unsure else None
+    if stronger:
+        for i, result in zip(unsure, await asyncio.gather(*(classify(*items[i - 1], config=config, tier=stronger) for i in unsure))):
+            results[i] = result
+    return [results[i] for i in range(1, len(items) + 1)]
+
+
+# Shared across sessions; only used when CLASSIFIER_BATCHING is on
+classification_batcher: MicroBatcher[Tuple[str, str], Tuple[str, float]] = MicroBatcher(
+    classify_batch,
+    max_size=get_classifier_batch_max_size(),
+    max_wait=get_classifier_batch_max_wait()
+)
+
+
+async def classifier_node(state: AgentState) -> AgentState:
+    """Classify user intent."""
+    user_query = state["user_query"]
+    messages = state.get("messages", [])
+    
+    # Pre-check: Force multi_step for batch operations (failsafe)
+    query_lower = user_query.lower()
+    batch_keywords = [
+        ("cancel", ["all", "both", "every"]),
+        ("reschedule", ["all", "both", "every"]),
+        ("book", ["multiple", "two", "three", "several", "few"])
+    ]
+    
+    for action, keywords in batch_keywords:
+        if action in query_lower:
+            if any(keyword in query_lower for keyword in keywords):
+                # Definitely a batch operation
+                state["intent"] = "multi_step"
+                state["confidence"] = 1.0
+                logger.info(f" Classification: intent=multi_step, confidence=1.00, query='{user_query[:50]}...' (batch keyword detected)")
+                return state
+    
+    # Build conversation history for context
+    conversation_history = "\n".join(messages[-3:]) if messages else "No previous conversation"
+    
+    try:
+        if get_classifier_batching():
+            intent, confidence = await classification_batcher.submit((user_query, conversation_history))
+        else:
+            intent, confidence = await classify(user_query, conversation_history)
+    except LLMDeadlineExceeded as e:
+        # Answer as a general message rather than failing the turn
+        logger.warning(f"⚠️ {e}, treating '{user_query[:50]}...' as general")
+        intent, confidence = "general", 0.0
+    
     # Store both intent and confidence in state
     state["intent"] = intent
     state["confidence"] = confidence
@@ -86,4 +174,3 @@ def classifier_node(state: AgentState) -> AgentState:
     logger.info(f"🎯 Classification: intent={intent}, confidence={confidence:.2f}, query='{user_query[:50]}...'")
     
     return state
-
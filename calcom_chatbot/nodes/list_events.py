@@ -1,33 +1,75 @@
 from calcom_chatbot.state import AgentState
-from calcom_chatbot.tools.cal_api import list_bookings
-from calcom_chatbot.utils.config import get_calcom_user_email
+from calcom_chatbot.tools.booking_sync import iter_upcoming_booking_pages, find_bookings
+from calcom_chatbot.utils.config import get_default_timezone
+from calcom_chatbot.utils.booking_filters import filters_from_query
+from calcom_chatbot.utils.booking_index import booking_index, booking_interval
+from calcom_chatbot.utils.date_resolver import resolve_range
+from calcom_chatbot.utils.streaming import emit
+from datetime import timedelta
+
+
+def _format_event(idx: int, booking: dict) -> str:
+    start = booking.get("start", "N/A")
+    title = booking.get("title", "Meeting")
+    return f"{idx}. {title} - {start}"
 
 
 async def list_events_node(state: AgentState) -> AgentState:
     """Handle listing events."""
-    # Note: user_email is not actually used in list_bookings anymore
-    # We query all bookings for the authenticated user (host)
-    user_email = get_calcom_user_email()
-    
+    user_query = state["user_query"]
+    default_timezone = get_default_timezone()
+    # "What do I have next week?" -> only show that window
+    window = resolve_range(user_query, default_timezone=default_timezone)
+    filters = filters_from_query(user_query, default_timezone=default_timezone)
+    status = filters.get("status", "upcoming")
+
     try:
-        # Get bookings asynchronously (queries all bookings where you are the host)
-        bookings = await list_bookings(user_email)
-        
+        if status != "upcoming" or "attendee_email" in filters or "attendee_name" in filters:
+            # Past/cancelled bookings come from Cal.com, attendee filters from the
+            # mirror; either way only matching bookings are fetched
+            bookings = await find_bookings(filters)
+        else:
+            # Served from the local mirror of all bookings where you are the host.
+            # On a cold mirror pages stream in from Cal.com; each one is emitted
+            # right away so streaming clients can render it before the rest loads.
+            bookings = []
+            async for page in iter_upcoming_booking_pages():
+                if window:
+                    page = [
+                        b for b in page
+                        if (interval := booking_interval(b)) and interval[0] < window[1] and interval[1] > window[0]
+                    ]
+                if page:
+                    emit({
+                        "node": "list_events",
+                        "type": "events_page",
+                        "events": [_format_event(len(bookings) + idx, b) for idx, b in enumerate(page, 1)]
+                    })
+                bookings.extend(page)
+            if window:
+                bookings = booking_index.overlapping(*window)
+
+        window_text = ""
+        if filters.get("attendee_email") or filters.get("attendee_name"):
+            window_text += f" with {filters.get('attendee_email') or filters.get('attendee_name')}"
+        if window:
+            start, end = window
+            last_day = (end - timedelta(microseconds=1)).date()
+            if start.date() == last_day:
+                window_text += f" on {start.date().isoformat()}"
+            else:
+                window_text += f" from {start.date().isoformat()} to {last_day.isoformat()}"
+
         state["api_response"] = {"bookings": bookings}
-        
+
+        kind = "scheduled" if status == "upcoming" else status
         if not bookings:
-            state["final_response"] = "You don't have any upcoming scheduled events."
+            state["final_response"] = f"You don't have any {status} {'scheduled ' if status == 'upcoming' else ''}events{window_text}."
         else:
             # Format bookings into a readable list
-            events_list = []
-            for idx, booking in enumerate(bookings, 1):
-                start = booking.get("start", "N/A")
-                title = booking.get("title", "Meeting")
-                events_list.append(f"{idx}. {title} - {start}")
-            
-            state["final_response"] = "Here are your scheduled events:\n" + "\n".join(events_list)
+            events_list = [_format_event(idx, booking) for idx, booking in enumerate(bookings, 1)]
+            state["final_response"] = f"Here are your {kind} events{window_text}:\n" + "\n".join(events_list)
     except Exception as e:
         state["final_response"] = f"I encountered an error while fetching your events: {str(e)}"
-    
-    return state
 
+    return state
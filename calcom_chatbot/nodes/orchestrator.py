@@ -1,6 +1,15 @@
-from langchain_openai import ChatOpenAI
 from calcom_chatbot.state import AgentState
-from calcom_chatbot.utils.config import get_openai_api_key
+from calcom_chatbot.tools.booking_sync import find_bookings
+from calcom_chatbot.tools.cal_api import bulk_cancel, bulk_reschedule
+from calcom_chatbot.utils.config import get_default_timezone
+from calcom_chatbot.utils.booking_filters import BookingFilters
+from calcom_chatbot.utils.booking_index import parse_time
+from calcom_chatbot.utils.date_resolver import resolve_range
+from calcom_chatbot.utils.hedging import LLMDeadlineExceeded
+from calcom_chatbot.utils.model_router import ainvoke_routed
+from calcom_chatbot.utils.plan_cache import plan_cache
+from calcom_chatbot.utils.profiler import span
+from calcom_chatbot.utils.streaming import emit, FINAL_ANSWER_TAG
 from calcom_chatbot.prompts.templates import ORCHESTRATOR_PROMPT, SOLVER_PROMPT
 from datetime import datetime, timezone
 import logging
@@ -8,6 +17,18 @@ import re
 
 logger = logging.getLogger(__name__)
 
+# Plan steps that act on every matching booking in one go
+BULK_ACTIONS = {"cancel_meetings", "reschedule_meetings"}
+PLAN_ACTIONS = {"list_events", "get_slots", "book_meeting", "cancel_meeting", "reschedule_meeting"} | BULK_ACTIONS
+
+
+def is_valid_plan(plan_text: str) -> bool:
+    """False for a PLAN with no steps or an unknown action (retried on a stronger model)."""
+    if not plan_text.startswith("PLAN:"):
+        return True
+    tasks = parse_plan(plan_text.replace("PLAN:", "").strip())
+    return bool(tasks) and all(task["action"] in PLAN_ACTIONS for task in tasks)
+
 
 async def orchestrator_node(state: AgentState) -> AgentState:
     """
@@ -21,41 +42,51 @@ async def orchestrator_node(state: AgentState) -> AgentState:
     user_query = state["user_query"]
     messages = state.get("messages", [])
     
-    llm = ChatOpenAI(
-        api_key=get_openai_api_key(),
-        model="gpt-4",
-        temperature=0
-    )
-    
     conversation_history = "\n".join(messages[-5:]) if messages else ""
+    # Only an opening message is planned from the message alone, so only those plans are cached
+    cacheable = not any(message.startswith("Assistant:") for message in messages)
     
     try:
-        # ============ PLANNER ============
-        planner_prompt = ORCHESTRATOR_PROMPT.format(
-            conversation_history=conversation_history,
-            user_query=user_query,
-            current_time=datetime.now(timezone.utc).isoformat()
-        )
-        
-        plan_response = llm.invoke(planner_prompt)
-        plan_text = plan_response.content.strip()
-        
-        logger.info(f"Planner Output: {plan_text[:200]}...")
-        
-        # Check if plan was generated
-        if not plan_text.startswith("PLAN:"):
-            # Planner is asking for more info
-            state["final_response"] = plan_text
-            return state
-        
-        # Parse plan into tasks
-        tasks = parse_plan(plan_text.replace("PLAN:", "").strip())
-        
-        if not tasks:
-            state["final_response"] = "I couldn't create a valid execution plan. Could you be more specific?"
-            return state
+        tasks = plan_cache.get(user_query) if cacheable else None
+        cached = tasks is not None
+        if cached:
+            logger.info("♻️ Reusing cached plan for this request shape")
+        else:
+            # ============ PLANNER ============
+            planner_prompt = ORCHESTRATOR_PROMPT.render(
+                conversation_history=conversation_history,
+                user_query=user_query,
+                current_time=datetime.now(timezone.utc).isoformat()
+            )
+            
+            plan_response = await ainvoke_routed("orchestrator_planner", planner_prompt, accept=is_valid_plan)
+            plan_text = plan_response.content.strip()
+            
+            logger.info(f"Planner Output: {plan_text[:200]}...")
+            
+            # Check if plan was generated
+            if not plan_text.startswith("PLAN:"):
+                # Planner is asking for more info
+                state["final_response"] = plan_text
+                return state
+            
+            # Parse plan into tasks
+            tasks = parse_plan(plan_text.replace("PLAN:", "").strip())
+            
+            if not tasks:
+                state["final_response"] = "I couldn't create a valid execution plan. Could you be more specific?"
+                return state
+            
+            if cacheable and is_valid_plan(plan_text):
+                plan_cache.put(user_query, tasks)
         
         logger.info(f"Plan parsed: {len(tasks)} tasks")
+        emit({
+            "node": "orchestrator",
+            "type": "plan",
+            "cached": cached,
+            "tasks": [{"id": f"E{i}", "action": task["action"]} for i, task in enumerate(tasks, 1)]
+        })
         
         # ============ EXECUTOR ============
         # Execute tasks and save results in variables (like ReWOO)
@@ -64,22 +95,34 @@ async def orchestrator_node(state: AgentState) -> AgentState:
         for i, task in enumerate(tasks, 1):
             task_id = f"E{i}"
             logger.info(f"Executing {task_id}: {task['action']} {task['params']}")
+            progress = {"node": "orchestrator", "type": "task", "id": task_id, "action": task["action"], "index": i, "total": len(tasks)}
+            emit({**progress, "status": "started"})
             
             # Execute task
-            result = await execute_task(task, state, variables)
+            with span(task_id, "task", action=task['action']):
+                result = await execute_task(task, state, variables)
             variables[task_id] = result
+            emit({**progress, "status": "done"})
             
             logger.info(f"{task_id} completed: {result[:100]}...")
         
         # ============ SOLVER ============
         # Use LLM to integrate all results into final answer
-        solver_prompt = SOLVER_PROMPT.format(
+        solver_prompt = SOLVER_PROMPT.render(
             user_query=user_query,
             task_results=format_task_results(tasks, variables)
         )
         
-        solver_response = llm.invoke(solver_prompt)
-        state["final_response"] = solver_response.content.strip()
+        # Not hedged: its tokens stream to the client
+        try:
+            solver_response = await ainvoke_routed(
+                "orchestrator_solver", solver_prompt, config={"tags": [FINAL_ANSWER_TAG]}, hedge=False
+            )
+            state["final_response"] = solver_response.content.strip()
+        except LLMDeadlineExceeded:
+            # The tasks already ran (possibly writes): show their raw results rather than an error
+            logger.warning("⚠️ Solver timed out, returning raw task results")
+            state["final_response"] = format_task_results(tasks, variables)
         
     except Exception as e:
         logger.error(f"❌ Orchestrator error: {e}")
@@ -156,6 +199,9 @@ async def execute_task(task: dict, state: AgentState, variables: dict) -> str:
     action = task['action']
     params = replace_variables(task['params'], variables)
     
+    if action in BULK_ACTIONS:
+        return await execute_bulk_task(action, params)
+    
     if action not in node_map:
         return f"Unknown action: {action}"
     
@@ -167,13 +213,84 @@ async def execute_task(task: dict, state: AgentState, variables: dict) -> str:
         confidence=1.0,
         booking_details=None,
         api_response=None,
-        final_response=""
+        final_response="",
+        session_id=state.get("session_id"),
+        idempotency_key=state.get("idempotency_key")
     )
     
     result_state = await node_map[action](task_state)
     return result_state.get("final_response", "No result")
 
 
+def bulk_filters(params: dict) -> BookingFilters:
+    """
+    Build booking filters from a bulk step's date/attendee params.
+    
+    Raises:
+        ValueError: If the date can't be resolved to a single day or range
+    """
+    filters: BookingFilters = {}
+    date = params.get("date", "")
+    if date:
+        window = resolve_range(date, default_timezone=get_default_timezone())
+        if not window:
+            raise ValueError(f"I couldn't understand the date \"{date}\". Please give a single day (YYYY-MM-DD) or a range like \"next week\".")
+        filters["after_start"] = window[0].strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        filters["before_end"] = window[1].strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    attendee = params.get("attendee", "")
+    if "@" in attendee:
+        filters["attendee_email"] = attendee
+    elif attendee:
+        filters["attendee_name"] = attendee
+    return filters
+
+
+async def execute_bulk_task(action: str, params: dict) -> str:
+    """Cancel or reschedule every booking matching a bulk step, with per-meeting results."""
+    reason = params.get("reason", "")
+    if not reason:
+        return "❌ A reason is required to cancel or reschedule meetings."
+    
+    try:
+        filters = bulk_filters(params)
+    except ValueError as e:
+        return f"❌ {e}"
+    if not filters:
+        # Never act on every upcoming booking
+        return "❌ A date or attendee is required to cancel or reschedule several meetings."
+    
+    bookings = await find_bookings(filters)
+    if not bookings:
+        return "No matching meetings found."
+    by_uid = {b.get("uid"): b for b in bookings}
+    
+    if action == "cancel_meetings":
+        results = await bulk_cancel(list(by_uid), reason)
+        verb = "Canceled"
+    else:
+        new_date = params.get("new_date", "")
+        if not re.fullmatch(r'\d{4}-\d{2}-\d{2}', new_date):
+            return "❌ A new date (YYYY-MM-DD) is required to reschedule meetings."
+        # Each meeting keeps its time of day on the new date
+        moves = [
+            {"uid": uid, "start": f"{new_date}T{parse_time(b.get('start', '')).strftime('%H:%M:%S')}Z"}
+            for uid, b in by_uid.items() if parse_time(b.get("start", ""))
+        ]
+        results = await bulk_reschedule(moves, reason)
+        verb = "Rescheduled"
+    
+    lines = []
+    for result in results:
+        booking = by_uid.get(result["uid"], {})
+        label = f"{booking.get('title', 'Meeting')} at {booking.get('start', '')}"
+        if result["ok"]:
+            lines.append(f"✅ {label}" + (f" → {result['start']}" if "start" in result else ""))
+        else:
+            lines.append(f"❌ {label}: {result['error']}")
+    succeeded = sum(1 for r in results if r["ok"])
+    return f"{verb} {succeeded} of {len(results)} meetings (reason: {reason}):\n" + "\n".join(lines)
+
+
 def format_task_query(action: str, params: dict) -> str:
     """Format task into a natural language query for the node."""
     if action == "list_events":
@@ -189,7 +306,8 @@ def format_task_query(action: str, params: dict) -> str:
         notes = params.get("notes", "")
         
         # Format as explicit BOOKING_READY to skip LLM parsing in book_meeting_node
-        query = f"BOOKING_READY: date={date}, time={time}, name={name}, email={email}"
+        # (the planner works in UTC: its current time and the slots it picks from are UTC)
+        query = f"BOOKING_READY: date={date}, time={time}, timezone=UTC, name={name}, email={email}"
         if notes:
             query += f", notes={notes}"
         return query
@@ -1,55 +1,107 @@
-from langchain_openai import ChatOpenAI
 from calcom_chatbot.state import AgentState
-from calcom_chatbot.tools.cal_api import list_bookings, reschedule_booking
-from calcom_chatbot.utils.config import get_openai_api_key, get_calcom_user_email
+from calcom_chatbot.tools.booking_sync import get_upcoming_bookings, find_bookings
+from calcom_chatbot.tools.cal_api import reschedule_booking
+from calcom_chatbot.utils.idempotency import idempotency_cache, idempotency_key, idempotency_scope
+from calcom_chatbot.utils.config import get_default_timezone, get_calcom_event_length
+from calcom_chatbot.utils.booking_filters import filters_from_query
+from calcom_chatbot.utils.booking_index import find_conflicts, format_conflicts
+from calcom_chatbot.utils.booking_matcher import match_bookings, format_bookings_text
+from calcom_chatbot.utils.date_resolver import resolve_datetime
+from calcom_chatbot.utils.model_router import ainvoke_routed
 from calcom_chatbot.prompts.templates import RESCHEDULE_MEETING_PROMPT
 from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 import re
 
 
+def split_reschedule_request(user_query: str) -> Tuple[str, str, Optional[str]]:
+    """
+    Split a reschedule message into (booking reference, new time, reason).
+
+    "move my 3pm meeting to tomorrow at 2pm, reason: clash" ->
+    ("move my 3pm meeting ", " tomorrow at 2pm, ", "clash"). Without a "to",
+    the whole message is both the reference and the new time.
+    """
+    reason_match = re.search(r'\breason\s*:\s*(.+)$', user_query, re.IGNORECASE | re.DOTALL)
+    request = user_query[:reason_match.start()] if reason_match else user_query
+    reason = reason_match.group(1).strip() if reason_match else None
+
+    parts = re.split(r'\bto\b', request, flags=re.IGNORECASE)
+    if len(parts) == 1:
+        return request, request, reason
+    return request[:len(request) - len(parts[-1]) - 2], parts[-1], reason
+
+
+def resolve_reschedule_locally(
+    user_query: str,
+    candidates: List[Dict[str, Any]],
+    confident: bool
+) -> Optional[str]:
+    """
+    Build a RESCHEDULE_READY line without the LLM when the booking and new time are unambiguous.
+
+    The booking must be a confident local match and the text after the last
+    "to" must resolve to exactly one date and time. A trailing "reason: ..."
+    is passed through as the reason.
+    """
+    if not confident:
+        return None
+    booking = candidates[0]
+
+    _, target, reason = split_reschedule_request(user_query)
+    resolved = resolve_datetime(target, default_timezone=get_default_timezone())
+    if not (resolved["date"] and resolved["time"]):
+        return None
+
+    line = f"RESCHEDULE_READY: booking_uid={booking.get('uid')}, new_time={resolved['date']}T{resolved['time']}:00Z"
+    if reason:
+        line += f", reason={reason}"
+    return line
+
+
+def is_well_formed(response_text: str) -> bool:
+    """False for a RESCHEDULE_READY line missing the booking or new time (retried on a stronger model)."""
+    if not response_text.startswith("RESCHEDULE_READY:"):
+        return True
+    return bool(re.search(r'booking_uid=([a-zA-Z0-9]+)', response_text) and re.search(r'new_time=([0-9T:\-Z]+)', response_text))
+
+
 async def reschedule_meeting_node(state: AgentState) -> AgentState:
     """Handle rescheduling meeting flow."""
     user_query = state["user_query"]
     messages = state.get("messages", [])
     
-    llm = ChatOpenAI(
-        api_key=get_openai_api_key(),
-        model="gpt-4",
-        temperature=0
-    )
-    
     # Build conversation history
     conversation_history = "\n".join(messages[-5:]) if messages else ""
     
     try:
-        # Get all upcoming bookings
-        user_email = get_calcom_user_email()
-        bookings = await list_bookings(user_email)
+        # Narrow to the attendee the message names before matching. Dates are
+        # left out: they usually describe the new time, not the booking.
+        filters = filters_from_query(user_query, include_dates=False)
+        filters.pop("status", None)
+        bookings = await find_bookings(filters) if filters else []
+        if not bookings:
+            bookings = await get_upcoming_bookings()
         
-        # Format bookings for LLM
-        bookings_info = []
-        for booking in bookings:
-            booking_uid = booking.get("uid")
-            title = booking.get("title", "Meeting")
-            start = booking.get("start", "")
-            attendees = booking.get("attendees", [])
-            attendee_names = ", ".join([a.get("name", "Unknown") for a in attendees])
-            bookings_info.append(
-                f"UID: {booking_uid}, Title: {title}, Start: {start}, Attendees: {attendee_names}"
-            )
+        # Only send the bookings the request most likely refers to. The new
+        # time is left out, or a booking already in that slot could match.
+        reference, _, _ = split_reschedule_request(user_query)
+        candidates, confident = match_bookings(bookings, reference, conversation_history)
         
-        bookings_text = "\n".join(bookings_info) if bookings else "No upcoming bookings"
+        # Skip the LLM round-trip when the booking and new time resolve locally
+        response_text = resolve_reschedule_locally(user_query, candidates, confident)
         
-        # Let LLM handle all user interaction
-        prompt = RESCHEDULE_MEETING_PROMPT.format(
-            conversation_history=conversation_history,
-            user_query=user_query,
-            bookings_text=bookings_text,
-            current_time=datetime.now(timezone.utc).isoformat()
-        )
+        if response_text is None:
+            # Let LLM handle all user interaction
+            prompt = RESCHEDULE_MEETING_PROMPT.render(
+                conversation_history=conversation_history,
+                user_query=user_query,
+                bookings_text=format_bookings_text(candidates, len(bookings)),
+                current_time=datetime.now(timezone.utc).isoformat()
+            )
 
-        response = llm.invoke(prompt)
-        response_text = response.content.strip()
+            response = await ainvoke_routed("reschedule_meeting", prompt, accept=is_well_formed, hedge=True)
+            response_text = response.content.strip()
         
         # Only check if ready to reschedule, otherwise return LLM's message
         if response_text.startswith("RESCHEDULE_READY:"):
@@ -62,10 +114,21 @@ async def reschedule_meeting_node(state: AgentState) -> AgentState:
                 booking_uid = uid_match.group(1)
                 new_start_time = time_match.group(1)
                 reason = reason_match.group(1).strip() if reason_match else None
+                scope = idempotency_scope(state.get("idempotency_key"), state.get("session_id"))
+                write_key = idempotency_key(scope, "reschedule", booking_uid, new_start_time) if scope else None
+                
+                # Reject known collisions locally instead of waiting for Cal.com
+                repeated = write_key is not None and idempotency_cache.seen(write_key)
+                conflicts = [] if repeated else find_conflicts(
+                    new_start_time, get_calcom_event_length(), exclude_uid=booking_uid
+                )
+                if conflicts:
+                    state["final_response"] = f"❌ {new_start_time} conflicts with {format_conflicts(conflicts)}. Please choose a different time."
+                    return state
                 
                 # Execute rescheduling
                 try:
-                    result = await reschedule_booking(booking_uid, new_start_time, reason)
+                    result = await reschedule_booking(booking_uid, new_start_time, reason, idempotency_key=write_key)
                     
                     # Get booking details for success message
                     booking_to_reschedule = next((b for b in bookings if b.get("uid") == booking_uid), None)
@@ -1,10 +1,10 @@
-from langchain_openai import ChatOpenAI
 from calcom_chatbot.state import AgentState
 from calcom_chatbot.prompts.templates import RESPONSE_FORMATTING_PROMPT
-from calcom_chatbot.utils.config import get_openai_api_key
+from calcom_chatbot.utils.model_router import ainvoke_routed
+from calcom_chatbot.utils.streaming import FINAL_ANSWER_TAG
 
 
-def response_node(state: AgentState) -> AgentState:
+async def response_node(state: AgentState) -> AgentState:
     """Format final response."""
     # If final_response is already set, return as is
     if state.get("final_response"):
@@ -14,19 +14,16 @@ def response_node(state: AgentState) -> AgentState:
     api_response = state.get("api_response", {})
     user_query = state["user_query"]
     
-    llm = ChatOpenAI(
-        api_key=get_openai_api_key(),
-        model="gpt-4",
-        temperature=0.7
-    )
-    
-    prompt = RESPONSE_FORMATTING_PROMPT.format(
+    prompt = RESPONSE_FORMATTING_PROMPT.render(
         intent=intent,
         api_response=api_response,
         user_query=user_query
     )
     
-    response = llm.invoke(prompt)
+    # Not hedged: its tokens stream to the client
+    response = await ainvoke_routed(
+        "response", prompt, temperature=0.7, config={"tags": [FINAL_ANSWER_TAG]}, hedge=False
+    )
     state["final_response"] = response.content
     
     return state
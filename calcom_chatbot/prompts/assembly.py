@@ -0,0 +1,162 @@
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from calcom_chatbot.utils.config import get_prompt_token_budgets
+from calcom_chatbot.utils.metrics import PROMPT_TOKENS, PROMPT_TRIMS
+from calcom_chatbot.utils.prompt_stats import prompt_stats
+import logging
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Total prompt tokens allowed per template unless PROMPT_TOKEN_BUDGETS overrides it
+DEFAULT_TOKEN_BUDGETS = {
+    "classifier": 2000,
+    "classifier_batch": 12000,
+    "book_meeting": 3000,
+    "cancel_meeting": 4000,
+    "reschedule_meeting": 4000,
+    "get_slots": 2000,
+    "orchestrator_planner": 8000,
+    "orchestrator_solver": 4000,
+    "response": 3000,
+}
+FALLBACK_TOKEN_BUDGET = 4000
+
+# Recount-and-cut rounds per section when line estimates undershoot
+TRIM_ATTEMPTS = 3
+
+
+class Section(NamedTuple):
+    """
+    A dynamic value appended after the static instructions.
+
+    trim says how it shrinks to fit the token budget: "oldest" drops leading
+    lines (conversation history), "latest" drops trailing lines (lists sorted
+    by relevance), "chars" cuts the end of the text; None never trims.
+    """
+    field: str
+    label: str
+    trim: Optional[str] = None
+
+
+class PromptTemplate:
+    """
+    A prompt split into static instructions and dynamic sections.
+
+    The instructions go in the system message, identical on every call, so
+    the provider can cache them as a prefix; the sections follow in a fixed
+    order in the user message.
+    """
+
+    def __init__(self, name: str, instructions: str, sections: List[Section]):
+        self.name = name
+        self.instructions = instructions.strip()
+        self.sections = sections
+
+    @property
+    def static_tokens(self) -> int:
+        return _static_tokens(self.instructions)
+
+    def render(self, **values: str) -> List[BaseMessage]:
+        """Build the messages for one call, trimming trimmable sections to the template's token budget."""
+        budget = token_budget(self.name)
+        texts = {section.field: str(values[section.field]) for section in self.sections}
+        total = self.static_tokens + _dynamic_tokens(self.sections, texts)
+
+        trimmed = False
+        # Trim in declaration order until the prompt fits
+        for section in self.sections:
+            if total <= budget:
+                break
+            if section.trim is None:
+                continue
+            original, excess = texts[section.field], total - budget
+            # Line costs are estimates, so recount and cut deeper if still over
+            for _ in range(TRIM_ATTEMPTS):
+                text = trim_to_fit(original, section.trim, excess)
+                if text == texts[section.field]:
+                    break
+                texts[section.field] = text
+                trimmed_total = self.static_tokens + _dynamic_tokens(self.sections, texts)
+                excess += trimmed_total - budget
+                total = trimmed_total
+                if total <= budget:
+                    break
+            if texts[section.field] != original:
+                trimmed = True
+                PROMPT_TRIMS.inc(template=self.name, section=section.field)
+        if total > budget:
+            logger.warning(f"⚠️ Prompt {self.name} is {total} tokens, over its {budget} budget after trimming")
+
+        PROMPT_TOKENS.observe(total, template=self.name)
+        prompt_stats.record_prompt(self.name, self.static_tokens, total, budget, trimmed)
+        return [
+            SystemMessage(content=self.instructions),
+            HumanMessage(content=render_sections(self.sections, texts)),
+        ]
+
+
+def render_sections(sections: List[Section], texts: Dict[str, str]) -> str:
+    return "\n\n".join(f"{section.label}:\n{texts[section.field]}" for section in sections)
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Optional[tiktoken.Encoding]:
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # The encoding is downloaded on first use; estimate when that isn't possible
+        logger.warning(f"⚠️ Token encoding unavailable ({e}), estimating prompt sizes")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in text for GPT-4-family models (about 4 characters per token without the encoding)."""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=64)
+def _static_tokens(instructions: str) -> int:
+    return count_tokens(instructions)
+
+
+def _dynamic_tokens(sections: List[Section], texts: Dict[str, str]) -> int:
+    return count_tokens(render_sections(sections, texts))
+
+
+def trim_to_fit(text: str, mode: str, excess: int) -> str:
+    """
+    Shrink text by about `excess` tokens, noting how much was left out.
+
+    Returns the text unchanged when nothing can be removed.
+    """
+    if mode == "chars":
+        tokens = count_tokens(text)
+        keep = max(0, tokens - excess)
+        if keep >= tokens:
+            return text
+        return text[:int(len(text) * keep / tokens)] + "\n(… truncated)"
+
+    lines = text.split("\n")
+    if len(lines) <= 1:
+        return text
+    # Cut enough to also pay for the marker line; always keep one line so the section still says something
+    target = excess + count_tokens("(… 000 earlier lines omitted)\n")
+    dropped, saved = 0, 0
+    while saved < target and dropped < len(lines) - 1:
+        index = dropped if mode == "oldest" else len(lines) - 1 - dropped
+        saved += count_tokens(lines[index] + "\n")
+        dropped += 1
+    if mode == "oldest":
+        return "\n".join([f"(… {dropped} earlier lines omitted)"] + lines[dropped:])
+    return "\n".join(lines[:len(lines) - dropped] + [f"(… {dropped} more not shown)"])
+
+
+def token_budget(template: str) -> int:
+    """Token budget for a template (PROMPT_TOKEN_BUDGETS overrides the defaults)."""
+    budgets = {**DEFAULT_TOKEN_BUDGETS, **get_prompt_token_budgets()}
+    return budgets.get(template, FALLBACK_TOKEN_BUDGET)
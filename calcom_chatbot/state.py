@@ -10,4 +10,6 @@ class AgentState(TypedDict):
     booking_details: Optional[Dict[str, Any]]
     api_response: Optional[Dict[str, Any]]
     final_response: str
+    session_id: Optional[str]
+    idempotency_key: Optional[str]  # Client-supplied key for deduplicating writes
 
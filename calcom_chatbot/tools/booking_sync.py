@@ -0,0 +1,235 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from calcom_chatbot.tools.cal_api import list_bookings, iter_booking_pages
+from calcom_chatbot.utils.booking_filters import BookingFilters
+from calcom_chatbot.utils.booking_index import booking_index, booking_interval, INACTIVE_STATUSES
+from calcom_chatbot.utils.booking_store import booking_store
+from calcom_chatbot.utils.metrics import CACHE_LOOKUPS
+from calcom_chatbot.utils.config import (
+    get_calcom_user_email,
+    get_booking_sync_interval,
+    get_calcom_webhook_secret,
+    get_webhook_sync_interval
+)
+
+logger = logging.getLogger(__name__)
+
+# Overlap between consecutive delta windows, to absorb clock skew with Cal.com
+SYNC_OVERLAP = timedelta(minutes=1)
+
+# Serializes syncs so a read-triggered sync never races the background worker
+_sync_lock = asyncio.Lock()
+
+# Running full resyncs (referenced so they aren't garbage-collected if their consumer stops early)
+_resync_tasks: Set[asyncio.Task] = set()
+
+# Ends a full resync's page queue
+_RESYNC_DONE = object()
+
+
+def current_sync_interval() -> float:
+    """
+    Polling interval for the mirror.
+
+    While webhooks arrive (one within the last WEBHOOK_SYNC_INTERVAL_SECONDS),
+    pushes keep the mirror current and polling only acts as a slow safety net.
+    Until the first one, or once they stop, polling runs at its normal rate.
+    """
+    webhook_interval = get_webhook_sync_interval()
+    push_age = booking_store.push_age()
+    if get_calcom_webhook_secret() and push_age is not None and push_age <= webhook_interval:
+        return webhook_interval
+    return get_booking_sync_interval()
+
+
+def _cursor_now() -> str:
+    """Cursor for the sync about to start, overlapped with the previous window."""
+    return (datetime.now(timezone.utc) - SYNC_OVERLAP).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+async def full_resync() -> int:
+    """
+    Replace the local mirror with every upcoming booking from Cal.com.
+
+    Returns:
+        Number of bookings stored
+    """
+    async for _ in iter_full_resync_pages():
+        pass
+    count = len(booking_store.upcoming())
+    logger.info(f"🔄 Full bookings resync: {count} bookings")
+    return count
+
+
+async def _run_full_resync(pages: "asyncio.Queue[Any]"):
+    """Fetch and store every upcoming booking under the sync lock, handing each stored page to `pages`."""
+    try:
+        async with _sync_lock:
+            cursor = _cursor_now()
+            seen = []
+            async for page in iter_booking_pages({"status": "upcoming"}):
+                booking_store.upsert_many(page)
+                seen.extend(b.get("uid") for b in page if b.get("uid"))
+                pages.put_nowait(page)
+            booking_store.prune(seen)
+            booking_store.set_cursor(cursor)
+            booking_index.load(booking_store.upcoming())
+    except Exception as e:
+        logger.error(f"❌ Full bookings resync failed: {e}")
+        pages.put_nowait(e)
+    else:
+        pages.put_nowait(_RESYNC_DONE)
+
+
+async def iter_full_resync_pages() -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Run a full resync, yielding each page as soon as it is stored.
+
+    Pages are written to the mirror as they arrive, and bookings that no
+    longer exist are pruned at the end, so readers never see an empty mirror.
+    The resync runs in its own task and the sync lock is never held across a
+    yield: a consumer that stops early (e.g. a disconnected stream) doesn't
+    stall other syncs, and the resync still completes.
+    """
+    pages: "asyncio.Queue[Any]" = asyncio.Queue()
+    task = asyncio.create_task(_run_full_resync(pages))
+    _resync_tasks.add(task)
+    task.add_done_callback(_resync_tasks.discard)
+    while True:
+        item = await pages.get()
+        if item is _RESYNC_DONE:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+async def sync_changes() -> int:
+    """
+    Fetch only bookings updated since the last sync and apply them to the mirror.
+
+    Status is not filtered, so cancellations and reschedules come through too.
+
+    Returns:
+        Number of changed bookings applied
+    """
+    async with _sync_lock:
+        since = booking_store.get_cursor()
+        cursor = _cursor_now()
+        changes = await list_bookings(
+            get_calcom_user_email(),
+            params={"afterUpdatedAt": since, "sortUpdatedAt": "asc"}
+        )
+        booking_store.upsert_many(changes)
+        booking_store.set_cursor(cursor)
+        for booking in changes:
+            booking_index.upsert(booking)
+        booking_index.touch()
+        if changes:
+            logger.info(f"🔄 Bookings delta sync: {len(changes)} changes")
+        return len(changes)
+
+
+async def sync_once() -> int:
+    """Run a delta sync, or a full resync if the mirror has never been filled."""
+    if booking_store.get_cursor() is None:
+        return await full_resync()
+    return await sync_changes()
+
+
+async def get_upcoming_bookings(max_age: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Read upcoming bookings from the local mirror.
+
+    Syncs inline only when the mirror is empty or older than max_age (defaults
+    to twice the current sync interval, i.e. the background worker is not
+    keeping up).
+
+    Returns:
+        Upcoming bookings in chronological order
+    """
+    await _refresh_if_stale(max_age)
+    return booking_store.upcoming()
+
+
+async def _refresh_if_stale(max_age: Optional[float] = None):
+    max_age = max_age if max_age is not None else 2 * current_sync_interval()
+    age = booking_store.age()
+    stale = age is None or age > max_age
+    CACHE_LOOKUPS.inc(cache="bookings_mirror", result="miss" if stale else "hit")
+    if stale:
+        await sync_once()
+    if not booking_index.is_fresh():
+        booking_index.load(booking_store.upcoming())
+
+
+async def find_bookings(filters: BookingFilters) -> List[Dict[str, Any]]:
+    """
+    Bookings matching structured filters.
+
+    Upcoming bookings are a filtered query on the local mirror; past,
+    cancelled and unconfirmed ones are not mirrored, so those filters are
+    pushed down to Cal.com instead.
+    """
+    if filters.get("status", "upcoming") == "upcoming":
+        await _refresh_if_stale()
+        return booking_store.query(filters)
+    return await list_bookings(get_calcom_user_email(), filters=filters)
+
+
+async def iter_upcoming_booking_pages() -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield upcoming bookings page by page.
+
+    A warm mirror answers in a single local page. A cold mirror is filled by a
+    streamed full resync, so callers can render the first page while later
+    pages are still loading.
+    """
+    if booking_store.age() is None:
+        now = datetime.now(timezone.utc)
+        async for page in iter_full_resync_pages():
+            yield [b for b in page if b.get("status") not in INACTIVE_STATUSES and _ends_after(b, now)]
+        return
+    yield await get_upcoming_bookings()
+
+
+def _ends_after(booking: Dict[str, Any], now: datetime) -> bool:
+    interval = booking_interval(booking)
+    return interval is not None and interval[1] > now
+
+
+class BookingSyncWorker:
+    """Background task that keeps the local bookings mirror current."""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start syncing in the background (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the background task."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await sync_once()
+            except Exception as e:
+                # Keep serving the last good mirror; retry on the next tick
+                logger.error(f"❌ Bookings sync failed: {e}")
+            await asyncio.sleep(self.interval or current_sync_interval())
+
+
+booking_sync_worker = BookingSyncWorker()
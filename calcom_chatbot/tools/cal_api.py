@@ -1,15 +1,129 @@
+import asyncio
 import httpx
 import logging
-from typing import Dict, List, Any, Optional
+import re
+import time
+from typing import AsyncIterator, Dict, List, Any, Optional
 from calcom_chatbot.utils.config import (
     get_calcom_api_key,
     get_calcom_base_url,
     get_calcom_event_type_id
 )
+from calcom_chatbot.utils.booking_filters import BookingFilters, filters_to_params
+from calcom_chatbot.utils.booking_index import booking_index
+from calcom_chatbot.utils.booking_store import booking_store
+from calcom_chatbot.utils.idempotency import idempotency_cache
+from calcom_chatbot.utils.metrics import CALCOM_LATENCY, CALCOM_REQUESTS
+from calcom_chatbot.utils.profiler import open_span, close_span
+from calcom_chatbot.utils.log_config import sample_body, truncate
+from calcom_chatbot.utils.slot_cache import slot_cache, validate_start_time
 
 # logger
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+# Cal.com caps "take" at 250; smaller pages keep each response light
+BOOKINGS_PAGE_SIZE = 100
+
+# Maximum concurrent writes in bulk cancel/reschedule, to stay under Cal.com rate limits
+BULK_CONCURRENCY = 5
+
+
+# Booking UIDs in paths are collapsed so metrics have one series per endpoint
+_UID_SEGMENT_RE = re.compile(r"(/bookings/)[^/]+")
+
+
+def _log_request(method: str, url: str, label: str, data: Any):
+    """Log an outgoing call; the body is sampled and truncated (see LOG_BODY_*)."""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    body = sample_body(str(data))
+    if body is None:
+        logger.info("📤 %s %s", method, url)
+    else:
+        logger.info("📤 %s %s | %s: %s", method, url, label, body)
+
+
+def _log_response(response: httpx.Response):
+    """Log a Cal.com response status; the body is sampled and truncated."""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    body = sample_body(response.text)
+    if body is None:
+        logger.info("📥 %s", response.status_code)
+    else:
+        logger.info("📥 %s | %s", response.status_code, body)
+
+
+def _endpoint(request: httpx.Request) -> str:
+    return _UID_SEGMENT_RE.sub(r"\1{uid}", request.url.path)
+
+
+class _TimedTransport(httpx.AsyncBaseTransport):
+    """
+    Times every Cal.com request for /metrics and profiles.
+
+    Requests that fail without a response (timeouts, connection errors) are
+    recorded too, with status "error".
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = _endpoint(request)
+        profile_span = open_span(f"{request.method} {endpoint}", "calcom")
+        started_at = time.perf_counter()
+        status: Any = "error"
+        try:
+            response = await self._transport.handle_async_request(request)
+            status = response.status_code
+            return response
+        finally:
+            CALCOM_LATENCY.observe(time.perf_counter() - started_at, method=request.method, endpoint=endpoint)
+            CALCOM_REQUESTS.inc(method=request.method, endpoint=endpoint, status=str(status))
+            close_span(profile_span, status=status)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _calcom_client(**kwargs) -> httpx.AsyncClient:
+    """HTTP client for Cal.com calls, timing every request for /metrics and profiles."""
+    return httpx.AsyncClient(transport=_TimedTransport(httpx.AsyncHTTPTransport()), **kwargs)
+
+
+def _written_bookings(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Bookings returned by a write (one or, for recurring events, several)."""
+    data = result.get("data") if isinstance(result, dict) else None
+    return [booking for booking in (data if isinstance(data, list) else [data]) if isinstance(booking, dict)]
+
+
+def _written_uids(result: Dict[str, Any]) -> List[str]:
+    return [booking["uid"] for booking in _written_bookings(result) if booking.get("uid")]
+
+
+def _index_written_bookings(result: Dict[str, Any]):
+    """Keep the local booking mirror and index current with bookings returned by a write."""
+    for booking in _written_bookings(result):
+        booking_store.upsert_many([booking])
+        booking_index.upsert(booking)
+        _invalidate_slots(booking.get("start", ""))
+
+
+def _invalidate_slots(start_time: str):
+    """Drop cached availability for the day of a booking that was created, moved or canceled."""
+    if start_time:
+        slot_cache.invalidate(start_time[:10])
+
+
+def _forget_booking(booking_uid: str):
+    """Remove a booking from the index, free its day in the slot cache and stop replaying writes to it."""
+    booking = booking_index.get(booking_uid)
+    if booking:
+        _invalidate_slots(booking.get("start", ""))
+    booking_store.mark_cancelled(booking_uid)
+    booking_index.remove(booking_uid)
+    idempotency_cache.forget(booking_uid)
 
 
 async def get_available_slots(date: str) -> List[Dict[str, Any]]:
@@ -22,6 +136,10 @@ async def get_available_slots(date: str) -> List[Dict[str, Any]]:
     Returns:
         List of available slots
     """
+    cached = slot_cache.get(date)
+    if cached is not None:
+        return cached
+    
     api_key = get_calcom_api_key()
     base_url = get_calcom_base_url()
     event_type_id = get_calcom_event_type_id()
@@ -39,20 +157,23 @@ async def get_available_slots(date: str) -> List[Dict[str, Any]]:
         "format": "range"  # Get start and end times for each slot
     }
     
-    async with httpx.AsyncClient() as client:
-        logger.info(f"📤 GET {url} | Params: {params}")
+    async with _calcom_client() as client:
+        _log_request("GET", url, "Params", params)
         response = await client.get(url, headers=headers, params=params)
-        logger.info(f"📥 {response.status_code} | {response.text[:200]}...")
+        _log_response(response)
         
         response.raise_for_status()
-        return response.json()
+        result = response.json()
+        slot_cache.put(date, result)
+        return result
 
 
 async def create_booking(
     start_time: str,
     attendee_email: str,
     attendee_name: str,
-    notes: Optional[str] = None
+    notes: Optional[str] = None,
+    idempotency_key: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Create a new booking.
@@ -62,10 +183,24 @@ async def create_booking(
         attendee_email: Email of the attendee
         attendee_name: Name of the attendee
         notes: Optional notes/reason for the meeting
+        idempotency_key: Optional key; repeats of the same key return the first booking
         
     Returns:
         Booking details
+        
+    Raises:
+        SlotUnavailableError: If cached availability shows the time is taken
     """
+    if idempotency_key:
+        return await idempotency_cache.run(
+            idempotency_key,
+            lambda: create_booking(start_time, attendee_email, attendee_name, notes),
+            uids=_written_uids
+        )
+    
+    # Fail fast on times the cached availability already rules out
+    validate_start_time(start_time)
+    
     api_key = get_calcom_api_key()
     base_url = get_calcom_base_url()
     event_type_id = get_calcom_event_type_id()
@@ -94,26 +229,29 @@ async def create_booking(
             "notes": notes
         }
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with _calcom_client(timeout=30.0) as client:
         try:
-            logger.info(f"📤 POST {url} | Payload: {payload}")
+            _log_request("POST", url, "Payload", payload)
             response = await client.post(url, headers=headers, json=payload)
-            logger.info(f"📥 {response.status_code} | {response.text}")
+            _log_response(response)
             
             response.raise_for_status()
-            return response.json()
+            result = response.json()
+            _index_written_bookings(result)
+            return result
         except httpx.HTTPStatusError as e:
             # 提供更详细的错误信息
             error_detail = e.response.text
-            logger.error(f"❌ Cal.com API Error: {e.response.status_code}")
-            logger.error(f"Error Detail: {error_detail}")
+            logger.error("❌ Cal.com API Error: %s", e.response.status_code)
+            logger.error("Error Detail: %s", truncate(error_detail))
             raise Exception(f"Cal.com API error: {e.response.status_code} - {error_detail}")
 
 
 async def reschedule_booking(
     booking_uid: str,
     new_start_time: str,
-    rescheduling_reason: Optional[str] = None
+    rescheduling_reason: Optional[str] = None,
+    idempotency_key: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Reschedule a booking to a new time.
@@ -122,10 +260,24 @@ async def reschedule_booking(
         booking_uid: UID of the booking to reschedule
         new_start_time: New start time in ISO format (e.g., "2024-12-20T14:00:00Z")
         rescheduling_reason: Optional reason for rescheduling
+        idempotency_key: Optional key; repeats of the same key return the first result
         
     Returns:
         Rescheduled booking details
+        
+    Raises:
+        SlotUnavailableError: If cached availability shows the new time is taken
     """
+    if idempotency_key:
+        return await idempotency_cache.run(
+            idempotency_key,
+            lambda: reschedule_booking(booking_uid, new_start_time, rescheduling_reason),
+            uids=lambda result: [booking_uid, *_written_uids(result)]
+        )
+    
+    # Fail fast on times the cached availability already rules out
+    validate_start_time(new_start_time)
+    
     api_key = get_calcom_api_key()
     base_url = get_calcom_base_url()
     
@@ -145,30 +297,44 @@ async def reschedule_booking(
     if rescheduling_reason:
         payload["reschedulingReason"] = rescheduling_reason
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with _calcom_client(timeout=30.0) as client:
         try:
-            logger.info(f"📤 POST {url} | Payload: {payload}")
+            _log_request("POST", url, "Payload", payload)
             response = await client.post(url, headers=headers, json=payload)
-            logger.info(f"📥 {response.status_code} | {response.text}")
+            _log_response(response)
             
             response.raise_for_status()
-            return response.json()
+            result = response.json()
+            _forget_booking(booking_uid)
+            _index_written_bookings(result)
+            return result
         except httpx.HTTPStatusError as e:
             error_detail = e.response.text
-            logger.error(f"❌ Cal.com API Error: {e.response.status_code}")
-            logger.error(f"Error Detail: {error_detail}")
+            logger.error("❌ Cal.com API Error: %s", e.response.status_code)
+            logger.error("Error Detail: %s", truncate(error_detail))
             raise Exception(f"Cal.com API error: {e.response.status_code} - {error_detail}")
 
 
-async def list_bookings(user_email: str) -> List[Dict[str, Any]]:
+async def iter_booking_pages(
+    filters: Optional[BookingFilters] = None,
+    params: Optional[Dict[str, Any]] = None,
+    page_size: int = BOOKINGS_PAGE_SIZE,
+    prefetch: bool = True
+) -> AsyncIterator[List[Dict[str, Any]]]:
     """
-    List all bookings for a user.
+    Stream bookings page by page, filtered server-side.
+    
+    While the caller handles one page, the next one is already being fetched,
+    so the first page can be rendered before later pages arrive.
     
     Args:
-        user_email: Email of the user (not used, queries all bookings for the authenticated user)
+        filters: Structured filters pushed down as Cal.com query parameters
+        params: Extra Cal.com query parameters (e.g. afterUpdatedAt)
+        page_size: Bookings per request ("take", max 250)
+        prefetch: Fetch the next page while the current one is being consumed
         
-    Returns:
-        List of bookings
+    Yields:
+        Lists of bookings, one per page
     """
     api_key = get_calcom_api_key()
     base_url = get_calcom_base_url()
@@ -180,18 +346,76 @@ async def list_bookings(user_email: str) -> List[Dict[str, Any]]:
         "cal-api-version": "2024-08-13"
     }
     
-    params = {
-        "status": "upcoming"
-    }
+    filters = filters or {}
+    limit = filters.get("limit")
+    if limit is not None:
+        page_size = min(page_size, limit)
     
-    async with httpx.AsyncClient() as client:
-        logger.info(f"📤 GET {url} | Params: {params}")
-        response = await client.get(url, headers=headers, params=params)
-        logger.info(f"📥 {response.status_code} | {response.text}")
-        
+    query = dict(params or {})
+    query.update(filters_to_params(filters))
+    query["take"] = page_size
+    
+    async def fetch_page(client: httpx.AsyncClient, skip: int) -> Dict[str, Any]:
+        page_params = {**query, "skip": skip}
+        _log_request("GET", url, "Params", page_params)
+        response = await client.get(url, headers=headers, params=page_params)
+        _log_response(response)
         response.raise_for_status()
-        data = response.json()
-        return data.get("data", [])
+        return response.json()
+    
+    async with _calcom_client(timeout=30.0) as client:
+        skip = 0
+        pending = asyncio.ensure_future(fetch_page(client, skip))
+        try:
+            while pending is not None:
+                data = await pending
+                pending = None
+                page = data.get("data", [])
+                
+                if limit is not None:
+                    page = page[:limit - skip]
+                pagination = data.get("pagination") or {}
+                has_next = bool(page) and pagination.get("hasNextPage", len(page) == page_size)
+                skip += len(page)
+                if limit is not None and skip >= limit:
+                    has_next = False
+                if has_next and prefetch:
+                    pending = asyncio.ensure_future(fetch_page(client, skip))
+                
+                if page:
+                    yield page
+                
+                if has_next and not prefetch:
+                    pending = asyncio.ensure_future(fetch_page(client, skip))
+        finally:
+            # Consumer stopped early: don't leave a prefetch running on a closed client
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+
+async def list_bookings(
+    user_email: str,
+    params: Optional[Dict[str, Any]] = None,
+    filters: Optional[BookingFilters] = None
+) -> List[Dict[str, Any]]:
+    """
+    List bookings for a user, following Cal.com pagination.
+    
+    Args:
+        user_email: Email of the user (not used, queries all bookings for the authenticated user)
+        params: Raw query parameters, e.g. afterUpdatedAt for delta syncs
+        filters: Structured filters (date range, attendee, event type, status, limit)
+        
+    Returns:
+        List of bookings (upcoming ones when neither params nor filters are given)
+    """
+    if params is None and filters is None:
+        filters = {"status": "upcoming"}
+    
+    bookings = []
+    async for page in iter_booking_pages(filters, params):
+        bookings.extend(page)
+    return bookings
 
 
 async def cancel_booking(booking_uid: str, cancellation_reason: Optional[str] = None) -> Dict[str, Any]:
@@ -223,17 +447,83 @@ async def cancel_booking(booking_uid: str, cancellation_reason: Optional[str] =
     if cancellation_reason:
         payload["cancellationReason"] = cancellation_reason
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with _calcom_client(timeout=30.0) as client:
         try:
-            logger.info(f"📤 POST {url} | Payload: {payload}")
+            _log_request("POST", url, "Payload", payload)
             response = await client.post(url, headers=headers, json=payload)
-            logger.info(f"📥 {response.status_code} | {response.text}")
+            _log_response(response)
             
             response.raise_for_status()
+            _forget_booking(booking_uid)
             return response.json()
         except httpx.HTTPStatusError as e:
             error_detail = e.response.text
-            logger.error(f"❌ Cal.com API Error: {e.response.status_code}")
-            logger.error(f"Error Detail: {error_detail}")
+            logger.error("❌ Cal.com API Error: %s", e.response.status_code)
+            logger.error("Error Detail: %s", truncate(error_detail))
             raise Exception(f"Cal.com API error: {e.response.status_code} - {error_detail}")
 
+
+async def _run_bulk(items: List[Any], operation, concurrency: int) -> List[Dict[str, Any]]:
+    """Run operation(item) for every item under a semaphore, capturing each outcome."""
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def run(item) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return {"ok": True, "result": await operation(item)}
+            except Exception as e:
+                return {"ok": False, "error": str(e)}
+    
+    return await asyncio.gather(*(run(item) for item in items))
+
+
+async def bulk_cancel(
+    booking_uids: List[str],
+    cancellation_reason: Optional[str] = None,
+    concurrency: int = BULK_CONCURRENCY
+) -> List[Dict[str, Any]]:
+    """
+    Cancel several bookings concurrently.
+    
+    Args:
+        booking_uids: UIDs of the bookings to cancel
+        cancellation_reason: Reason applied to every cancellation
+        concurrency: Maximum number of requests in flight
+        
+    Returns:
+        One result per UID, in order: {"uid", "ok", "result"} or {"uid", "ok", "error"}
+    """
+    results = await _run_bulk(
+        booking_uids,
+        lambda uid: cancel_booking(uid, cancellation_reason),
+        concurrency
+    )
+    failed = sum(1 for r in results if not r["ok"])
+    logger.info("📦 Bulk cancel: %d ok, %d failed", len(results) - failed, failed)
+    return [{"uid": uid, **result} for uid, result in zip(booking_uids, results)]
+
+
+async def bulk_reschedule(
+    moves: List[Dict[str, str]],
+    rescheduling_reason: Optional[str] = None,
+    concurrency: int = BULK_CONCURRENCY
+) -> List[Dict[str, Any]]:
+    """
+    Reschedule several bookings concurrently.
+    
+    Args:
+        moves: [{"uid": booking UID, "start": new ISO start time}, ...]
+        rescheduling_reason: Reason applied to every reschedule
+        concurrency: Maximum number of requests in flight
+        
+    Returns:
+        One result per move, in order: {"uid", "start", "ok", "result"} or {"uid", "start", "ok", "error"}
+    """
+    results = await _run_bulk(
+        moves,
+        lambda move: reschedule_booking(move["uid"], move["start"], rescheduling_reason),
+        concurrency
+    )
+    failed = sum(1 for r in results if not r["ok"])
+    logger.info("📦 Bulk reschedule: %d ok, %d failed", len(results) - failed, failed)
+    return [{"uid": move["uid"], "start": move["start"], **result} for move, result in zip(moves, results)]
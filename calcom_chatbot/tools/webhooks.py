@@ -0,0 +1,96 @@
+import hashlib
+import hmac
+import logging
+from typing import Any, Dict, Optional
+from calcom_chatbot.utils.booking_index import booking_index
+from calcom_chatbot.utils.booking_store import booking_store
+from calcom_chatbot.utils.idempotency import idempotency_cache
+from calcom_chatbot.utils.slot_cache import slot_cache
+
+logger = logging.getLogger(__name__)
+
+# Cal.com webhook triggers that change the bookings view
+BOOKING_TRIGGERS = {"BOOKING_CREATED", "BOOKING_CANCELLED", "BOOKING_RESCHEDULED"}
+
+
+def verify_signature(body: bytes, signature: Optional[str], secret: str) -> bool:
+    """
+    Verify a Cal.com webhook signature.
+
+    Cal.com sends the hex HMAC-SHA256 of the raw request body, keyed with the
+    webhook secret, in the X-Cal-Signature-256 header.
+    """
+    if not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature.strip())
+
+
+def booking_from_webhook(payload: Dict[str, Any], trigger: str, received_at: Optional[str] = None) -> Dict[str, Any]:
+    """Convert a webhook payload into the v2 /bookings shape used by the mirror and index."""
+    status = (payload.get("status") or "").lower() or "accepted"
+    if trigger == "BOOKING_CANCELLED":
+        status = "cancelled"
+    return {
+        "uid": payload.get("uid"),
+        "title": payload.get("title", "Meeting"),
+        "start": payload.get("startTime"),
+        "end": payload.get("endTime"),
+        "status": status,
+        "eventTypeId": payload.get("eventTypeId"),
+        "attendees": [
+            {"name": a.get("name"), "email": a.get("email"), "timeZone": a.get("timeZone")}
+            for a in payload.get("attendees", [])
+        ],
+        "updatedAt": received_at,
+    }
+
+
+def _invalidate_day(start_time: Optional[str]):
+    if start_time:
+        slot_cache.invalidate(start_time[:10])
+
+
+def _forget(uid: Optional[str]):
+    """Mark a booking cancelled, free its day in the slot cache and stop replaying writes to it."""
+    if not uid:
+        return
+    previous = booking_store.get(uid)
+    if previous:
+        _invalidate_day(previous.get("start"))
+    booking_store.mark_cancelled(uid)
+    booking_index.remove(uid)
+    idempotency_cache.forget(uid)
+
+
+def apply_webhook_event(event: Dict[str, Any]) -> bool:
+    """
+    Apply a Cal.com webhook event to the local bookings view.
+
+    Args:
+        event: Parsed webhook body ({"triggerEvent", "createdAt", "payload"})
+
+    Returns:
+        True if the event changed local state, False if it was ignored
+    """
+    trigger = event.get("triggerEvent")
+    payload = event.get("payload") or {}
+    if trigger not in BOOKING_TRIGGERS or not isinstance(payload, dict) or not payload.get("uid"):
+        return False
+
+    booking = booking_from_webhook(payload, trigger, event.get("createdAt"))
+
+    if trigger == "BOOKING_RESCHEDULED":
+        # The original booking is replaced by a new UID
+        _forget(payload.get("rescheduleUid") or payload.get("fromReschedule"))
+
+    if trigger == "BOOKING_CANCELLED":
+        _forget(booking["uid"])
+    else:
+        booking_store.upsert_many([booking])
+        booking_index.upsert(booking)
+
+    _invalidate_day(booking.get("start"))
+    booking_store.record_push()
+    logger.info(f"📨 Webhook {trigger}: {booking['uid']}")
+    return True
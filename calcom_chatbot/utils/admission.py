@@ -0,0 +1,141 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Tuple
+from calcom_chatbot.utils.config import (
+    get_max_concurrent_turns,
+    get_max_queued_turns,
+    get_session_rate_limit,
+    get_session_burst
+)
+from calcom_chatbot.utils.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_REJECTED
+import asyncio
+import math
+import time
+
+
+# Initial guess for how long a turn holds a slot, before real turns are measured
+INITIAL_TURN_SECONDS = 5.0
+
+# Weight of the latest turn in the moving average of turn duration
+TURN_TIME_SMOOTHING = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Raised when a turn is shed instead of queued; retry_after is in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Rejected ({reason}), retry after {retry_after}s")
+
+
+class AdmissionController:
+    """
+    Limits concurrent graph runs, with a bounded, deadline-aware wait queue.
+
+    A turn is rejected right away when the queue is full or when the expected
+    wait (queue position x average turn time / concurrency) already exceeds its
+    deadline; a queued turn that reaches its deadline gives up its place.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.queued = 0
+        self.avg_turn_seconds = INITIAL_TURN_SECONDS
+
+    def expected_wait(self) -> float:
+        """Rough wait for a turn joining the queue now."""
+        if self.in_flight < self.max_concurrent and self.queued == 0:
+            return 0.0
+        return (self.queued + 1) * self.avg_turn_seconds / self.max_concurrent
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.expected_wait()))
+
+    def _reject(self, reason: str):
+        ADMISSION_REJECTED.inc(reason=reason)
+        raise AdmissionRejected(reason, self._retry_after())
+
+    def _publish(self):
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        ADMISSION_QUEUED.set(self.queued)
+
+    @asynccontextmanager
+    async def admit(self, deadline: float) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of a turn.
+
+        Args:
+            deadline: Seconds the caller is willing to wait for the turn to finish
+
+        Raises:
+            AdmissionRejected: If the queue is full or the turn can't start in time
+        """
+        if not self._semaphore.locked() and not self.queued:
+            await self._semaphore.acquire()
+        else:
+            if self.queued >= self.max_queue:
+                self._reject("queue_full")
+            # Shed now rather than doing work the client will have given up on
+            if self.expected_wait() + self.avg_turn_seconds > deadline:
+                self._reject("deadline")
+
+            self.queued += 1
+            self._publish()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=deadline - self.avg_turn_seconds)
+            except asyncio.TimeoutError:
+                self._reject("deadline")
+            finally:
+                self.queued -= 1
+                self._publish()
+
+        self.in_flight += 1
+        self._publish()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self.avg_turn_seconds += TURN_TIME_SMOOTHING * (elapsed - self.avg_turn_seconds)
+            self.in_flight -= 1
+            self._semaphore.release()
+            self._publish()
+
+
+class SessionRateLimiter:
+    """Token bucket per session: `burst` turns at once, refilled at `per_minute`."""
+
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def check(self, session_id: str):
+        """
+        Take one token for a session's turn.
+
+        Raises:
+            AdmissionRejected: If the session is over its rate (retry_after until the next token)
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(session_id, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        if tokens < 1.0:
+            self._buckets[session_id] = (tokens, now)
+            ADMISSION_REJECTED.inc(reason="session_rate")
+            raise AdmissionRejected("session_rate", max(1, math.ceil((1.0 - tokens) / self.rate)))
+        self._buckets[session_id] = (tokens - 1.0, now)
+
+    def prune(self, idle_seconds: float = 3600):
+        """Forget sessions whose bucket has been full for a while."""
+        now = time.monotonic()
+        for session_id in [s for s, (_, updated) in self._buckets.items() if now - updated > idle_seconds]:
+            del self._buckets[session_id]
+
+
+# Process-wide limits for /chat
+admission_controller = AdmissionController(get_max_concurrent_turns(), get_max_queued_turns())
+session_rate_limiter = SessionRateLimiter(get_session_rate_limit(), get_session_burst())
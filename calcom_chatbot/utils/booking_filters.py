@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, TypedDict
+from calcom_chatbot.utils.date_resolver import resolve_range
+import re
+
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# "with John" / "with John Smith" - capitalized to skip "with the team", "with my manager"
+_ATTENDEE_NAME_RE = re.compile(r"\bwith\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)\b")
+
+
+class BookingFilters(TypedDict, total=False):
+    """Structured booking query, applied by Cal.com or the local mirror."""
+    after_start: str       # ISO time; bookings starting at/after
+    before_end: str        # ISO time; bookings ending at/before
+    attendee_email: str
+    attendee_name: str     # Case-insensitive substring of an attendee's name
+    event_type_id: int
+    status: str            # upcoming (default), past, cancelled, unconfirmed
+    limit: int             # Maximum number of bookings returned
+
+
+def _iso(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def filters_to_params(filters: BookingFilters) -> Dict[str, Any]:
+    """
+    Map filters to Cal.com v2 /bookings query parameters.
+
+    "limit" is not included: it is applied by capping "take" and stopping pagination.
+    """
+    mapping = {
+        "after_start": "afterStart",
+        "before_end": "beforeEnd",
+        "attendee_email": "attendeeEmail",
+        "attendee_name": "attendeeName",
+        "event_type_id": "eventTypeId",
+        "status": "status",
+    }
+    return {param: filters[key] for key, param in mapping.items() if filters.get(key) is not None}
+
+
+def filters_from_query(
+    text: str,
+    now: Optional[datetime] = None,
+    default_timezone: str = "UTC",
+    include_dates: bool = True
+) -> BookingFilters:
+    """
+    Derive booking filters from a user message.
+
+    Picks up a date window ("next week", "tomorrow afternoon"), an attendee
+    email or "with <Name>", and past/cancelled/unconfirmed wording.
+
+    Args:
+        text: User message
+        now: Reference time (defaults to now)
+        default_timezone: Timezone for dates without an explicit one
+        include_dates: Set False when the text also names a *new* time (reschedules)
+    """
+    filters: BookingFilters = {}
+    lowered = text.lower()
+
+    if include_dates:
+        window = resolve_range(text, now, default_timezone)
+        if window:
+            filters["after_start"] = _iso(window[0])
+            filters["before_end"] = _iso(window[1])
+
+    email = _EMAIL_RE.search(text)
+    if email:
+        filters["attendee_email"] = email.group(0).lower()
+    else:
+        name = _ATTENDEE_NAME_RE.search(text)
+        if name:
+            filters["attendee_name"] = name.group(1)
+
+    if re.search(r"\bcancell?ed\b", lowered):
+        filters["status"] = "cancelled"
+    elif re.search(r"\b(?:past|previous|last)\s+(?:meetings?|events?|bookings?)\b", lowered):
+        filters["status"] = "past"
+    elif re.search(r"\b(?:unconfirmed|pending)\b", lowered):
+        filters["status"] = "unconfirmed"
+
+    return filters
@@ -0,0 +1,157 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import time
+
+
+# Bookings with these statuses no longer occupy their time range
+INACTIVE_STATUSES = {"cancelled", "rejected"}
+
+# Used when a booking has neither an end time nor a duration
+DEFAULT_DURATION = timedelta(minutes=30)
+
+# How long a loaded index is trusted for conflict checks without a refresh
+INDEX_MAX_AGE_SECONDS = 300
+
+
+def parse_time(value: str) -> Optional[datetime]:
+    """Parse an ISO timestamp (with or without a trailing Z) as an aware UTC datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def booking_interval(booking: Dict[str, Any]) -> Optional[Tuple[datetime, datetime]]:
+    """Return a booking's [start, end) interval, or None if it has no usable start."""
+    start = parse_time(booking.get("start", ""))
+    if start is None:
+        return None
+    end = parse_time(booking.get("end", ""))
+    if end is None or end <= start:
+        duration = booking.get("duration")
+        end = start + (timedelta(minutes=duration) if duration else DEFAULT_DURATION)
+    return start, end
+
+
+class BookingIndex:
+    """
+    In-memory interval index over bookings.
+
+    Bookings are kept sorted by start time. Since an interval can only overlap
+    [start, end) if it starts in [start - longest_duration, end), overlap and
+    range queries are a binary search plus a scan of the matches.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[datetime, str]] = []      # (start, uid), sorted
+        self._entries: Dict[str, Tuple[datetime, datetime, Dict[str, Any]]] = {}
+        self._longest = DEFAULT_DURATION
+        self.loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, bookings: List[Dict[str, Any]]):
+        """Replace the index contents with a full bookings list."""
+        self._keys = []
+        self._entries = {}
+        self._longest = DEFAULT_DURATION
+        for booking in bookings:
+            self._insert(booking)
+        self._keys.sort()
+        self.loaded_at = time.monotonic()
+
+    def touch(self):
+        """Mark the index as current after an incremental update."""
+        self.loaded_at = time.monotonic()
+
+    def is_fresh(self, max_age: float = INDEX_MAX_AGE_SECONDS) -> bool:
+        """Whether the index was loaded recently enough to trust for conflict checks."""
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at <= max_age
+
+    def _insert(self, booking: Dict[str, Any], keep_sorted: bool = False):
+        uid = booking.get("uid")
+        interval = booking_interval(booking)
+        if not uid or interval is None or booking.get("status") in INACTIVE_STATUSES:
+            return
+        start, end = interval
+        self._entries[uid] = (start, end, booking)
+        if keep_sorted:
+            insort(self._keys, (start, uid))
+        else:
+            self._keys.append((start, uid))
+        self._longest = max(self._longest, end - start)
+
+    def upsert(self, booking: Dict[str, Any]):
+        """Add or replace a booking (cancelled bookings are removed)."""
+        uid = booking.get("uid")
+        if uid:
+            self.remove(uid)
+            self._insert(booking, keep_sorted=True)
+
+    def remove(self, uid: str):
+        """Remove a booking by UID if present."""
+        entry = self._entries.pop(uid, None)
+        if entry is None:
+            return
+        idx = bisect_left(self._keys, (entry[0], uid))
+        if idx < len(self._keys) and self._keys[idx] == (entry[0], uid):
+            del self._keys[idx]
+
+    def get(self, uid: str) -> Optional[Dict[str, Any]]:
+        """Look up a booking by UID."""
+        entry = self._entries.get(uid)
+        return entry[2] if entry else None
+
+    def all(self) -> List[Dict[str, Any]]:
+        """All indexed bookings in chronological order."""
+        return [self._entries[uid][2] for _, uid in self._keys]
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Bookings whose interval overlaps [start, end), in chronological order."""
+        lo = bisect_left(self._keys, (start - self._longest, ""))
+        hi = bisect_left(self._keys, (end, ""))
+        results = []
+        for _, uid in self._keys[lo:hi]:
+            _, booking_end, booking = self._entries[uid]
+            if booking_end > start:
+                results.append(booking)
+        return results
+
+    def starting_between(self, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Bookings that start in [start, end), in chronological order."""
+        lo = bisect_left(self._keys, (start, ""))
+        hi = bisect_left(self._keys, (end, ""))
+        return [self._entries[uid][2] for _, uid in self._keys[lo:hi]]
+
+    def conflicts(self, start: datetime, end: datetime, exclude_uid: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Bookings that collide with a proposed [start, end) slot."""
+        return [b for b in self.overlapping(start, end) if b.get("uid") != exclude_uid]
+
+
+# Process-wide index, refreshed by bookings syncs and updated on every write
+booking_index = BookingIndex()
+
+
+def find_conflicts(start_time: str, length_minutes: int, exclude_uid: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Bookings that would collide with a new booking at start_time.
+
+    Returns an empty list when the index is stale, so an out-of-date view
+    never blocks a booking; Cal.com still has the final say.
+    """
+    start = parse_time(start_time)
+    if start is None or not booking_index.is_fresh():
+        return []
+    return booking_index.conflicts(start, start + timedelta(minutes=length_minutes), exclude_uid)
+
+
+def format_conflicts(conflicts: List[Dict[str, Any]]) -> str:
+    """Describe conflicting bookings for a user-facing message."""
+    return ", ".join(f"{b.get('title', 'Meeting')} ({b.get('start', '')})" for b in conflicts)
@@ -0,0 +1,173 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+from calcom_chatbot.utils.date_resolver import find_dates, find_times
+import re
+
+
+# Maximum number of bookings passed to the LLM when no single booking stands out
+MATCH_TOP_K = 5
+
+# A booking is a "confident match" when it scores at least this much
+# and beats the runner-up by CONFIDENT_MARGIN
+CONFIDENT_SCORE = 6.0
+CONFIDENT_MARGIN = 3.0
+
+# Weight of earlier conversation turns relative to the latest user message
+HISTORY_WEIGHT = 0.5
+
+STOPWORDS = {
+    "a", "an", "and", "at", "be", "by", "can", "cancel", "for", "from", "i", "in",
+    "is", "it", "me", "meeting", "meetings", "move", "my", "of", "on", "please",
+    "reason", "reschedule", "the", "this", "to", "want", "with", "you", "user",
+    "assistant", "call", "event", "events", "booking", "between", "am", "pm",
+}
+
+def format_booking(booking: Dict[str, Any]) -> str:
+    """Format a single booking as one line of prompt context."""
+    booking_uid = booking.get("uid")
+    title = booking.get("title", "Meeting")
+    start = booking.get("start", "")
+    attendees = booking.get("attendees", [])
+    attendee_names = ", ".join([a.get("name", "Unknown") for a in attendees])
+    return f"UID: {booking_uid}, Title: {title}, Start: {start}, Attendees: {attendee_names}"
+
+
+def format_bookings_text(candidates: List[Dict[str, Any]], total: int) -> str:
+    """Format candidate bookings for the LLM, noting when the list was pre-filtered."""
+    if not candidates:
+        return "No upcoming bookings"
+
+    lines = [format_booking(booking) for booking in candidates]
+    if len(candidates) < total:
+        lines.insert(0, f"(Showing {len(candidates)} of {total} upcoming bookings most relevant to the request)")
+    return "\n".join(lines)
+
+
+def _tokens(text: str) -> Set[str]:
+    """Lowercase word tokens with stopwords removed."""
+    words = (re.sub(r"'s$", "", w).strip("'.-") for w in re.findall(r"[a-z0-9@._'-]+", text.lower()))
+    return {w for w in words if w and w not in STOPWORDS}
+
+
+def _parse_start(booking: Dict[str, Any]) -> Optional[datetime]:
+    """Parse a booking's ISO start time."""
+    start = booking.get("start")
+    if not start:
+        return None
+    try:
+        return datetime.fromisoformat(start.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _query_features(text: str, now: datetime) -> Tuple[Set[str], Set[str], Set[str]]:
+    """Pre-compute tokens, dates and times of free text once per request."""
+    dates = {d.isoformat() for d in find_dates(text, now.date())}
+    times = {t.strftime("%H:%M") for t in find_times(text)}
+    return _tokens(text), dates, times
+
+
+def _signal_score(booking: Dict[str, Any], features: Tuple[Set[str], Set[str], Set[str]]) -> float:
+    """Score how strongly free text refers to a booking (attendee, title, date, time)."""
+    tokens, dates, times = features
+    if not tokens:
+        return 0.0
+
+    score = 0.0
+
+    # Attendee names and emails are the strongest signal
+    for attendee in booking.get("attendees", []):
+        name_tokens = _tokens(attendee.get("name", ""))
+        matched = name_tokens & tokens
+        score += 3.0 * len(matched)
+        if name_tokens and matched == name_tokens:
+            score += 2.0
+        email = (attendee.get("email") or "").lower()
+        if email and (email in tokens or email.split("@")[0] in tokens):
+            score += 5.0
+
+    # Title words
+    score += 1.5 * len(_tokens(booking.get("title", "")) & tokens)
+
+    # Date and time expressions
+    start = _parse_start(booking)
+    if start:
+        if start.date().isoformat() in dates:
+            score += 4.0
+        if start.strftime("%H:%M") in times:
+            score += 3.0
+
+    return score
+
+
+def _recency_score(booking: Dict[str, Any], now: datetime) -> float:
+    """Small tie-breaker that favors sooner bookings."""
+    start = _parse_start(booking)
+    if not start:
+        return 0.0
+    days_away = max((start - now).total_seconds() / 86400, 0.0)
+    return 1.0 / (1.0 + days_away)
+
+
+def match_bookings(
+    bookings: List[Dict[str, Any]],
+    user_query: str,
+    conversation_history: str = "",
+    now: Optional[datetime] = None,
+    top_k: int = MATCH_TOP_K
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Pick the bookings most likely referred to by the user.
+
+    Args:
+        bookings: Upcoming bookings from Cal.com
+        user_query: Latest user message
+        conversation_history: Recent conversation turns for multi-turn requests
+        now: Reference time for relative dates (defaults to current UTC time)
+        top_k: Maximum number of candidates to return
+
+    Returns:
+        (candidates, confident). A confident match is returned alone; otherwise
+        up to top_k bookings. Candidates keep their original (chronological)
+        order, so "pick the first meeting" instructions behave as before.
+    """
+    if not bookings:
+        return [], False
+
+    now = now or datetime.now(timezone.utc)
+
+    query_features = _query_features(user_query, now)
+    history_features = _query_features(conversation_history, now) if conversation_history else None
+
+    scored = []
+    for idx, booking in enumerate(bookings):
+        signal = _signal_score(booking, query_features)
+        if history_features:
+            signal += HISTORY_WEIGHT * _signal_score(booking, history_features)
+        scored.append((signal, _recency_score(booking, now), idx))
+
+    ranked = sorted(scored, key=lambda item: (item[0], item[1]), reverse=True)
+    best_signal = ranked[0][0]
+    runner_up_signal = ranked[1][0] if len(ranked) > 1 else 0.0
+
+    if best_signal >= CONFIDENT_SCORE and best_signal - runner_up_signal >= CONFIDENT_MARGIN:
+        return [bookings[ranked[0][2]]], True
+
+    if best_signal <= 0:
+        # Nothing in the request points at a booking; keep the soonest ones
+        return list(bookings[:top_k]), False
+
+    keep = sorted(idx for _, _, idx in ranked[:top_k])
+    return [bookings[idx] for idx in keep], False
+
+
+def select_candidates(
+    bookings: List[Dict[str, Any]],
+    user_query: str,
+    conversation_history: str = "",
+    now: Optional[datetime] = None,
+    top_k: int = MATCH_TOP_K
+) -> List[Dict[str, Any]]:
+    """Return only the candidate bookings of match_bookings."""
+    candidates, _ = match_bookings(bookings, user_query, conversation_history, now, top_k)
+    return candidates
@@ -0,0 +1,189 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from calcom_chatbot.utils.booking_filters import BookingFilters
+from calcom_chatbot.utils.booking_index import INACTIVE_STATUSES, booking_interval, parse_time
+from calcom_chatbot.utils.config import get_bookings_db_path
+import json
+import sqlite3
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    uid TEXT PRIMARY KEY,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    status TEXT,
+    updated_at TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_end ON bookings(end);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _iso(value: datetime) -> str:
+    """UTC timestamp that sorts lexicographically in SQLite."""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class BookingStore:
+    """
+    Local SQLite mirror of Cal.com bookings.
+
+    Holds one row per booking UID (including cancelled ones, so incremental
+    syncs can apply status changes) plus the sync cursor.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self.last_synced_at: Optional[float] = None
+        self.last_push_at: Optional[float] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+            if self.get_cursor() is not None:
+                # Rows from a previous run are a valid starting point for a delta sync
+                self.last_synced_at = float("-inf")
+        return self._conn
+
+    def _row(self, booking: Dict[str, Any]) -> Optional[tuple]:
+        interval = booking_interval(booking)
+        if not booking.get("uid") or interval is None:
+            return None
+        start, end = interval
+        return (
+            booking["uid"], _iso(start), _iso(end), booking.get("status"),
+            booking.get("updatedAt"), json.dumps(booking)
+        )
+
+    def upsert_many(self, bookings: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace bookings; returns the number of rows written."""
+        rows = [row for row in (self._row(b) for b in bookings) if row]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO bookings (uid, start, end, status, updated_at, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def replace_all(self, bookings: Iterable[Dict[str, Any]]) -> int:
+        """Replace the whole mirror (full resync)."""
+        rows = [row for row in (self._row(b) for b in bookings) if row]
+        with self.conn:
+            self.conn.execute("DELETE FROM bookings")
+            self.conn.executemany(
+                "INSERT INTO bookings (uid, start, end, status, updated_at, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def prune(self, keep_uids: Iterable[str]) -> int:
+        """Delete every booking not in keep_uids (end of a streamed full resync)."""
+        with self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM bookings WHERE uid NOT IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(keep_uids)),)
+            )
+        return cursor.rowcount
+
+    def mark_cancelled(self, uid: str):
+        """Record a cancellation made through the bot without waiting for the next sync."""
+        row = self.conn.execute("SELECT payload FROM bookings WHERE uid = ?", (uid,)).fetchone()
+        if row:
+            booking = json.loads(row[0])
+            booking["status"] = "cancelled"
+            self.upsert_many([booking])
+
+    def get(self, uid: str) -> Optional[Dict[str, Any]]:
+        """Look up a booking by UID."""
+        row = self.conn.execute("SELECT payload FROM bookings WHERE uid = ?", (uid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def upcoming(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Active bookings that have not ended yet, in chronological order."""
+        placeholders = ", ".join("?" for _ in INACTIVE_STATUSES)
+        rows = self.conn.execute(
+            f"SELECT payload FROM bookings WHERE end > ? AND COALESCE(status, '') NOT IN ({placeholders}) ORDER BY start",
+            (_iso(now or datetime.now(timezone.utc)), *INACTIVE_STATUSES)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def query(self, filters: BookingFilters, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Upcoming bookings matching filters, in chronological order.
+
+        Same semantics as the Cal.com query parameters: after_start/before_end
+        bound the booking's start/end, attendee_name is a case-insensitive
+        substring match. Status is ignored (the mirror only serves upcoming).
+        """
+        placeholders = ", ".join("?" for _ in INACTIVE_STATUSES)
+        clauses = ["end > ?", f"COALESCE(status, '') NOT IN ({placeholders})"]
+        args: List[Any] = [_iso(now or datetime.now(timezone.utc)), *INACTIVE_STATUSES]
+
+        if filters.get("after_start"):
+            clauses.append("start >= ?")
+            args.append(_iso(parse_time(filters["after_start"])))
+        if filters.get("before_end"):
+            clauses.append("end <= ?")
+            args.append(_iso(parse_time(filters["before_end"])))
+        if filters.get("event_type_id") is not None:
+            clauses.append("json_extract(payload, '$.eventTypeId') = ?")
+            args.append(int(filters["event_type_id"]))
+        if filters.get("attendee_email"):
+            clauses.append(
+                "EXISTS (SELECT 1 FROM json_each(payload, '$.attendees') "
+                "WHERE lower(json_extract(value, '$.email')) = lower(?))"
+            )
+            args.append(filters["attendee_email"])
+        if filters.get("attendee_name"):
+            clauses.append(
+                "EXISTS (SELECT 1 FROM json_each(payload, '$.attendees') "
+                "WHERE lower(json_extract(value, '$.name')) LIKE '%' || lower(?) || '%')"
+            )
+            args.append(filters["attendee_name"])
+
+        sql = f"SELECT payload FROM bookings WHERE {' AND '.join(clauses)} ORDER BY start"
+        if filters.get("limit") is not None:
+            sql += " LIMIT ?"
+            args.append(int(filters["limit"]))
+        return [json.loads(row[0]) for row in self.conn.execute(sql, args).fetchall()]
+
+    def get_cursor(self) -> Optional[str]:
+        """ISO timestamp of the last successful sync (for afterUpdatedAt)."""
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key = 'cursor'").fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, cursor: str):
+        """Store the sync cursor after a successful sync."""
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('cursor', ?)", (cursor,))
+        self.last_synced_at = time.monotonic()
+
+    def record_push(self):
+        """Note that a webhook just updated the mirror."""
+        self.last_push_at = time.monotonic()
+
+    def push_age(self) -> Optional[float]:
+        """Seconds since a webhook last updated the mirror, or None if none has arrived."""
+        if self.last_push_at is None:
+            return None
+        return time.monotonic() - self.last_push_at
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last successful sync, or None if the mirror was never filled."""
+        self.conn  # Opening the database picks up a cursor from a previous run
+        if self.last_synced_at is None:
+            return None
+        return time.monotonic() - self.last_synced_at
+
+
+# Process-wide mirror
+booking_store = BookingStore(get_bookings_db_path())
@@ -1,4 +1,5 @@
 import os
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -36,11 +37,185 @@ def get_calcom_event_type_id() -> int:
     return int(event_type_id)
 
 
+def get_calcom_event_length() -> int:
+    """Get the Cal.com event type length in minutes (used for local conflict checks)."""
+    return int(os.getenv("CALCOM_EVENT_LENGTH_MINUTES", "30"))
+
+
 def get_calcom_base_url() -> str:
     """Get Cal.com API base URL from environment."""
     return os.getenv("CALCOM_API_BASE_URL", "https://api.cal.com/v2")
 
 
+def get_default_timezone() -> str:
+    """Get the timezone used for date/time expressions without an explicit one."""
+    return os.getenv("DEFAULT_TIMEZONE", "UTC")
+
+
+def get_bookings_db_path() -> str:
+    """Get the path of the local SQLite bookings mirror."""
+    return os.getenv("BOOKINGS_DB_PATH", "bookings.db")
+
+
+def get_booking_sync_interval() -> float:
+    """Get the interval in seconds between incremental bookings syncs."""
+    return float(os.getenv("BOOKING_SYNC_INTERVAL_SECONDS", "60"))
+
+
+def get_calcom_webhook_secret() -> Optional[str]:
+    """Get the Cal.com webhook signing secret (webhooks are disabled without it)."""
+    return os.getenv("CALCOM_WEBHOOK_SECRET") or None
+
+
+def get_webhook_sync_interval() -> float:
+    """Get the safety-net sync interval in seconds used while webhooks keep the mirror current."""
+    return float(os.getenv("WEBHOOK_SYNC_INTERVAL_SECONDS", "900"))
+
+
+def get_loop_block_threshold() -> float:
+    """Get how long (seconds) a callback may hold the event loop before its stack is logged."""
+    return float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "250")) / 1000
+
+
+def get_max_concurrent_turns() -> int:
+    """Get how many chat turns may run the graph at once."""
+    return int(os.getenv("MAX_CONCURRENT_TURNS", "8"))
+
+
+def get_max_queued_turns() -> int:
+    """Get how many chat turns may wait for a slot before new ones get 503."""
+    return int(os.getenv("MAX_QUEUED_TURNS", "32"))
+
+
+def get_turn_deadline() -> float:
+    """Get how long (seconds) a client is expected to wait for a reply; turns that can't finish in time are shed."""
+    return float(os.getenv("TURN_DEADLINE_SECONDS", "30"))
+
+
+def get_session_rate_limit() -> float:
+    """Get the sustained number of turns per minute allowed for one session."""
+    return float(os.getenv("SESSION_RATE_PER_MINUTE", "20"))
+
+
+def get_session_burst() -> int:
+    """Get how many turns one session may send back-to-back before its rate limit applies."""
+    return int(os.getenv("SESSION_BURST", "5"))
+
+
+def get_session_coalesce_window() -> float:
+    """Get how long (seconds) a session's turn waits for follow-up messages to answer together (0 disables coalescing)."""
+    return float(os.getenv("SESSION_COALESCE_MS", "0")) / 1000
+
+
+def get_classifier_batching() -> bool:
+    """Get whether concurrent intent classifications are micro-batched into one LLM call."""
+    return os.getenv("CLASSIFIER_BATCHING", "false").lower() == "true"
+
+
+def get_classifier_batch_max_size() -> int:
+    """Get the most messages classified in one batched LLM call."""
+    return int(os.getenv("CLASSIFIER_BATCH_MAX_SIZE", "16"))
+
+
+def get_classifier_batch_max_wait() -> float:
+    """Get how long (seconds) the first message of a classification batch waits for others."""
+    return float(os.getenv("CLASSIFIER_BATCH_MAX_WAIT_MS", "15")) / 1000
+
+
+def get_prompt_token_budgets() -> Dict[str, int]:
+    """Get per-template prompt token budgets overriding the defaults, e.g. "orchestrator_planner=6000,response=2000"."""
+    budgets = {}
+    for item in os.getenv("PROMPT_TOKEN_BUDGETS", "").split(","):
+        if "=" in item:
+            name, budget = item.split("=", 1)
+            budgets[name.strip()] = int(budget)
+    return budgets
+
+
+def get_plan_cache_size() -> int:
+    """Get how many orchestrator plan templates are kept (0 disables plan caching)."""
+    return int(os.getenv("PLAN_CACHE_SIZE", "256"))
+
+
+def get_model_tier_names() -> Dict[str, str]:
+    """Get the OpenAI model behind each tier."""
+    return {
+        "fast": os.getenv("MODEL_FAST", "gpt-4o-mini"),
+        "standard": os.getenv("MODEL_STANDARD", "gpt-4o"),
+        "strong": os.getenv("MODEL_STRONG", "gpt-4"),
+    }
+
+
+def get_node_model_tiers() -> Dict[str, str]:
+    """Get per-node model tiers overriding the defaults, e.g. "classifier=standard,response=fast"."""
+    tiers = {}
+    for item in os.getenv("NODE_MODEL_TIERS", "").split(","):
+        if "=" in item:
+            node, tier = item.split("=", 1)
+            tiers[node.strip()] = tier.strip()
+    return tiers
+
+
+def get_turn_latency_budget() -> float:
+    """Get the LLM latency budget (seconds) of one turn; near the end, calls use a faster model."""
+    return float(os.getenv("TURN_LATENCY_BUDGET_SECONDS", "20"))
+
+
+def get_turn_cost_budget() -> float:
+    """Get the LLM cost budget (USD) of one turn; near the end, calls use a cheaper model."""
+    return float(os.getenv("TURN_COST_BUDGET_USD", "0.25"))
+
+
+def get_llm_call_timeout() -> float:
+    """Get the longest an LLM call may take (seconds); inside a turn it's also capped by the turn's remaining latency budget."""
+    return float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "20"))
+
+
+def get_llm_hedging() -> bool:
+    """Get whether slow classifier and extraction calls get a hedged duplicate request."""
+    return os.getenv("LLM_HEDGING", "true").lower() == "true"
+
+
+def get_llm_hedge_quantile() -> float:
+    """Get the latency quantile of recent calls after which a hedged request is sent."""
+    return float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+
+
+def get_llm_hedge_delay() -> float:
+    """Get the hedging delay (seconds) used until enough calls have been timed."""
+    return float(os.getenv("LLM_HEDGE_DELAY_MS", "3000")) / 1000
+
+
+def get_log_level() -> str:
+    """Get the default log level."""
+    return os.getenv("LOG_LEVEL", "INFO").upper()
+
+
+def get_log_levels() -> str:
+    """Get per-module log level overrides, e.g. "calcom_chatbot.tools.cal_api=WARNING,httpx=WARNING"."""
+    return os.getenv("LOG_LEVELS", "httpx=WARNING")
+
+
+def get_log_format() -> str:
+    """Get the log output format: json (default) or text."""
+    return os.getenv("LOG_FORMAT", "json").lower()
+
+
+def get_log_body_max_chars() -> int:
+    """Get the maximum number of characters of a request/response body written to the log."""
+    return int(os.getenv("LOG_BODY_MAX_CHARS", "500"))
+
+
+def get_log_body_sample_rate() -> float:
+    """Get the fraction (0-1) of request/response bodies that are logged."""
+    return float(os.getenv("LOG_BODY_SAMPLE_RATE", "1.0"))
+
+
+def get_admin_token() -> Optional[str]:
+    """Get the token for admin-only features such as request profiling (disabled without it)."""
+    return os.getenv("ADMIN_TOKEN") or None
+
+
 def setup_langsmith():
     """Setup LangSmith tracing if enabled."""
     if os.getenv("LANGSMITH_TRACING", "false").lower() == "true":
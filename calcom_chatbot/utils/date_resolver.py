@@ -0,0 +1,306 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional, Tuple, TypedDict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import re
+
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+# "sat" and "sun" are left out: as plain words they are far more common than as weekdays
+WEEKDAY_ABBREVIATIONS = {"mon": 0, "tue": 1, "tues": 1, "wed": 2, "thu": 3, "thur": 3, "thurs": 3, "fri": 4}
+
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3, "apr": 4, "april": 4,
+    "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7, "aug": 8, "august": 8, "sep": 9, "sept": 9,
+    "september": 9, "oct": 10, "october": 10, "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+
+# Time-of-day phrases as [start, end) hour windows
+PERIODS = {
+    "morning": (6, 12),
+    "afternoon": (12, 17),
+    "evening": (17, 21),
+    "tonight": (17, 23),
+    "night": (19, 23),
+}
+
+# Common timezone abbreviations (standard/daylight resolved by the IANA zone)
+TIMEZONE_ABBREVIATIONS = {
+    "utc": "UTC", "gmt": "UTC", "z": "UTC",
+    "et": "America/New_York", "est": "America/New_York", "edt": "America/New_York",
+    "ct": "America/Chicago", "cst": "America/Chicago", "cdt": "America/Chicago",
+    "mt": "America/Denver", "mst": "America/Denver", "mdt": "America/Denver",
+    "pt": "America/Los_Angeles", "pst": "America/Los_Angeles", "pdt": "America/Los_Angeles",
+    "bst": "Europe/London", "cet": "Europe/Paris", "cest": "Europe/Paris",
+    "ist": "Asia/Kolkata", "jst": "Asia/Tokyo", "aest": "Australia/Sydney",
+}
+
+_MONTH_PATTERN = "|".join(sorted(MONTHS, key=len, reverse=True))
+_WEEKDAY_PATTERN = "|".join(WEEKDAYS + sorted(WEEKDAY_ABBREVIATIONS, key=len, reverse=True))
+
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})(?!\d)")
+_MONTH_DAY_RE = re.compile(rf"\b({_MONTH_PATTERN})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s*(\d{{4}}))?")
+_DAY_MONTH_RE = re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({_MONTH_PATTERN})\b(?:,?\s*(\d{{4}}))?")
+_RELATIVE_RE = re.compile(r"\bin\s+(\d+|a|one|two|three|four|five|six|seven)\s+(day|week)s?\b")
+_WEEKDAY_RE = re.compile(rf"\b(?:(this|next|coming)\s+)?({_WEEKDAY_PATTERN})\b")
+_MERIDIEM_TIME_RE = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\s*(a\.?m\.?|p\.?m\.?)(?![a-z])")
+_24H_TIME_RE = re.compile(r"(?<![\d-])(\d{1,2}):(\d{2})(?::\d{2})?(?!\s*(?:a\.?m|p\.?m))(?![\d-])")
+_UTC_OFFSET_RE = re.compile(r"\b(?:utc|gmt)\s*([+-])\s*(\d{1,2})(?::?(\d{2}))?\b")
+_AFTER_TIME_RE = re.compile(r"(?:\d|[ap]\.?m\.?)\s*\(?$")
+_IANA_ZONE_RE = re.compile(r"\b([A-Z][A-Za-z_]+/[A-Z][A-Za-z_]+(?:/[A-Z][A-Za-z_]+)?)\b")
+
+_NUMBER_WORDS = {"a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7}
+
+
+class ResolvedDateTime(TypedDict):
+    """Result of resolving a natural-language date/time, normalized to UTC."""
+    date: Optional[str]          # YYYY-MM-DD
+    time: Optional[str]          # HH:MM (24-hour)
+    period: Optional[str]        # Time-of-day phrase such as "afternoon"
+    window_start: Optional[str]  # ISO start of the period on `date`
+    window_end: Optional[str]    # ISO end of the period on `date`
+    timezone: str                # Timezone the user's expression was interpreted in
+
+
+def _add_year(month: int, day: int, year: Optional[str], today: date) -> Optional[date]:
+    """Build a date, rolling month/day expressions without a year into the future."""
+    try:
+        if year:
+            return date(int(year), month, day)
+        candidate = date(today.year, month, day)
+        if candidate < today:
+            candidate = date(today.year + 1, month, day)
+        return candidate
+    except ValueError:
+        return None
+
+
+def find_date_spans(text: str, today: date) -> List[Tuple[int, int, date]]:
+    """
+    Find every date expression in the text as (start, end, date), in order of appearance.
+
+    Handles ISO dates, today/tonight/tomorrow/day after tomorrow, "in N days/weeks",
+    weekdays ("friday", "this friday", "next tuesday") and month names ("Oct 29").
+    A bare or "this" weekday is its next occurrence (today included); "next"
+    always skips today.
+    """
+    lowered = text.lower()
+    found: List[Tuple[int, int, date]] = []
+
+    for match in _ISO_DATE_RE.finditer(lowered):
+        try:
+            found.append((match.start(), match.end(), date(int(match.group(1)), int(match.group(2)), int(match.group(3)))))
+        except ValueError:
+            continue
+
+    for match in re.finditer(r"\bday after tomorrow\b", lowered):
+        found.append((match.start(), match.end(), today + timedelta(days=2)))
+    lowered_no_dat = re.sub(r"\bday after tomorrow\b", lambda m: " " * len(m.group(0)), lowered)
+    for match in re.finditer(r"\btomorrow\b", lowered_no_dat):
+        found.append((match.start(), match.end(), today + timedelta(days=1)))
+    for match in re.finditer(r"\b(today|tonight)\b", lowered):
+        found.append((match.start(), match.end(), today))
+
+    for match in _RELATIVE_RE.finditer(lowered):
+        count = _NUMBER_WORDS.get(match.group(1)) or int(match.group(1))
+        days = count * (7 if match.group(2) == "week" else 1)
+        found.append((match.start(), match.end(), today + timedelta(days=days)))
+
+    for match in _WEEKDAY_RE.finditer(lowered):
+        modifier, name = match.group(1), match.group(2)
+        weekday = WEEKDAYS.index(name) if name in WEEKDAYS else WEEKDAY_ABBREVIATIONS[name]
+        days_ahead = (weekday - today.weekday()) % 7
+        if modifier == "next" and days_ahead == 0:
+            days_ahead = 7
+        found.append((match.start(), match.end(), today + timedelta(days=days_ahead)))
+
+    for match in _MONTH_DAY_RE.finditer(lowered):
+        resolved = _add_year(MONTHS[match.group(1)], int(match.group(2)), match.group(3), today)
+        if resolved:
+            found.append((match.start(), match.end(), resolved))
+    for match in _DAY_MONTH_RE.finditer(lowered):
+        resolved = _add_year(MONTHS[match.group(2)], int(match.group(1)), match.group(3), today)
+        if resolved:
+            found.append((match.start(), match.end(), resolved))
+
+    found.sort(key=lambda item: item[0])
+    return found
+
+
+def find_dates(text: str, today: date) -> List[date]:
+    """Find every date expression in the text, in order of appearance (see find_date_spans)."""
+    return [value for _, _, value in find_date_spans(text, today)]
+
+
+def find_time_spans(text: str) -> List[Tuple[int, int, time]]:
+    """Find every clock-time expression ("3pm", "3:30 p.m.", "15:00", "noon") as (start, end, time), in order of appearance."""
+    lowered = text.lower()
+    found: List[Tuple[int, int, time]] = []
+
+    for match in _MERIDIEM_TIME_RE.finditer(lowered):
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if not 1 <= hour <= 12 or minute > 59:
+            continue
+        hour = hour % 12 + (12 if match.group(3).startswith("p") else 0)
+        found.append((match.start(), match.end(), time(hour, minute)))
+
+    for match in _24H_TIME_RE.finditer(lowered):
+        hour, minute = int(match.group(1)), int(match.group(2))
+        if hour <= 23 and minute <= 59:
+            found.append((match.start(), match.end(), time(hour, minute)))
+
+    for match in re.finditer(r"\b(noon|midday|midnight)\b", lowered):
+        found.append((match.start(), match.end(), time(0, 0) if match.group(1) == "midnight" else time(12, 0)))
+
+    found.sort(key=lambda item: item[0])
+    return found
+
+
+def find_times(text: str) -> List[time]:
+    """Find every clock-time expression in order of appearance (see find_time_spans)."""
+    return [value for _, _, value in find_time_spans(text)]
+
+
+def find_period(text: str) -> Optional[str]:
+    """Find a time-of-day phrase such as "morning" or "afternoon"."""
+    lowered = text.lower()
+    for period in PERIODS:
+        if re.search(rf"\b{period}\b", lowered):
+            return period
+    return None
+
+
+def find_timezone(text: str, default: str = "UTC") -> timezone:
+    """
+    Find a timezone in the text: IANA names ("Europe/London"), UTC offsets
+    ("UTC+2") or common abbreviations ("EST", "PT"). Falls back to `default`.
+    """
+    match = _IANA_ZONE_RE.search(text)
+    if match:
+        try:
+            return ZoneInfo(match.group(1))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+
+    lowered = text.lower()
+    match = _UTC_OFFSET_RE.search(lowered)
+    if match:
+        offset = timedelta(hours=int(match.group(2)), minutes=int(match.group(3) or 0))
+        return timezone(offset if match.group(1) == "+" else -offset)
+
+    # Abbreviations only count right after a clock time, so words like "at" or "et al" are not misread
+    for match in re.finditer(r"\b([a-z]{1,4})\b", lowered):
+        if match.group(1) in TIMEZONE_ABBREVIATIONS and _AFTER_TIME_RE.search(lowered[:match.start()]):
+            return ZoneInfo(TIMEZONE_ABBREVIATIONS[match.group(1)])
+
+    return ZoneInfo(default)
+
+
+def local_to_utc(day: str, clock: str, timezone_name: str) -> datetime:
+    """UTC instant of a YYYY-MM-DD date and HH:MM time on a timezone's wall clock."""
+    local = datetime.combine(date.fromisoformat(day), time.fromisoformat(clock), tzinfo=ZoneInfo(timezone_name))
+    return local.astimezone(timezone.utc)
+
+
+def resolve_datetime(text: str, now: Optional[datetime] = None, default_timezone: str = "UTC") -> ResolvedDateTime:
+    """
+    Resolve the date/time a message refers to, normalized to UTC.
+
+    A field is only set when the text names exactly one distinct value for it;
+    ambiguous or missing expressions are left as None so callers can fall back
+    to the LLM.
+
+    Args:
+        text: User message (or the relevant part of it)
+        now: Reference time (defaults to current UTC time)
+        default_timezone: Timezone for expressions without an explicit one
+
+    Returns:
+        ResolvedDateTime with UTC date/time
+    """
+    now = now or datetime.now(timezone.utc)
+    tz = find_timezone(text, default_timezone)
+    today = now.astimezone(tz).date()
+
+    dates = list(dict.fromkeys(find_dates(text, today)))
+    times = list(dict.fromkeys(find_times(text)))
+    period = find_period(text)
+
+    resolved_date = dates[0] if len(dates) == 1 else None
+    resolved_time = times[0] if len(times) == 1 else None
+
+    window_start = window_end = None
+    if resolved_date and period and not resolved_time:
+        start_hour, end_hour = PERIODS[period]
+        window_start = datetime.combine(resolved_date, time(start_hour), tzinfo=tz).astimezone(timezone.utc)
+        window_end = datetime.combine(resolved_date, time(end_hour), tzinfo=tz).astimezone(timezone.utc)
+
+    if resolved_date and resolved_time:
+        # Convert the combined local date/time to UTC (the date can shift)
+        local = datetime.combine(resolved_date, resolved_time, tzinfo=tz)
+        utc = local.astimezone(timezone.utc)
+        resolved_date, resolved_time = utc.date(), utc.time()
+    elif resolved_time:
+        # Time alone: convert using today's offset
+        local = datetime.combine(today, resolved_time, tzinfo=tz)
+        resolved_time = local.astimezone(timezone.utc).time()
+
+    return ResolvedDateTime(
+        date=resolved_date.isoformat() if resolved_date else None,
+        time=resolved_time.strftime("%H:%M") if resolved_time else None,
+        period=period if not resolved_time else None,
+        window_start=window_start.isoformat() if window_start else None,
+        window_end=window_end.isoformat() if window_end else None,
+        timezone=str(tz)
+    )
+
+
+
+def resolve_range(text: str, now: Optional[datetime] = None, default_timezone: str = "UTC") -> Optional[Tuple[datetime, datetime]]:
+    """
+    Resolve the time window a question refers to ("what do I have next week?").
+
+    Handles today/tomorrow/a single date (optionally with a time-of-day phrase),
+    "this week", "next week", "this weekend", "this month", "next month" and
+    "next N days". Weeks start on Monday.
+
+    Returns:
+        UTC [start, end) datetimes, or None if no window is mentioned
+    """
+    now = now or datetime.now(timezone.utc)
+    tz = find_timezone(text, default_timezone)
+    local_now = now.astimezone(tz)
+    today = local_now.date()
+    lowered = text.lower()
+
+    def window(first: date, last_exclusive: date) -> Tuple[datetime, datetime]:
+        return (
+            datetime.combine(first, time(0), tzinfo=tz).astimezone(timezone.utc),
+            datetime.combine(last_exclusive, time(0), tzinfo=tz).astimezone(timezone.utc),
+        )
+
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+
+    match = re.search(r"\b(?:next|coming)\s+(\d+)\s+days\b", lowered)
+    if match:
+        return window(today, today + timedelta(days=int(match.group(1))))
+    if re.search(r"\bnext week\b", lowered):
+        return window(week_start + timedelta(days=7), week_start + timedelta(days=14))
+    if re.search(r"\b(?:this|the rest of the) week\b", lowered):
+        return now, window(today, week_start + timedelta(days=7))[1]
+    if re.search(r"\bweekend\b", lowered):
+        saturday = week_start + timedelta(days=5)
+        return window(max(saturday, today), week_start + timedelta(days=7))
+    if re.search(r"\bnext month\b", lowered):
+        return window(next_month_start, (next_month_start + timedelta(days=32)).replace(day=1))
+    if re.search(r"\bthis month\b", lowered):
+        return now, window(today, next_month_start)[1]
+
+    resolved = resolve_datetime(text, now, default_timezone)
+    if resolved["window_start"]:
+        return datetime.fromisoformat(resolved["window_start"]), datetime.fromisoformat(resolved["window_end"])
+    dates = list(dict.fromkeys(find_dates(text, today)))
+    if len(dates) == 1:
+        return window(dates[0], dates[0] + timedelta(days=1))
+    return None
@@ -0,0 +1,133 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from calcom_chatbot.utils.config import get_llm_hedge_quantile, get_llm_hedge_delay
+from calcom_chatbot.utils.metrics import LLM_HEDGES, LLM_TIMEOUTS
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Recent calls kept per (node, model), and how many are needed before their quantile replaces LLM_HEDGE_DELAY_MS
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """An LLM call (and its hedge) didn't answer within its deadline."""
+
+    def __init__(self, node: str, deadline: float):
+        super().__init__(f"LLM call for {node} timed out after {deadline:.1f}s")
+        self.node = node
+        self.deadline = deadline
+
+
+class LatencyTracker:
+    """Recent LLM call durations per (node, model), for the hedging delay."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+
+    def observe(self, node: str, model: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault((node, model), deque(maxlen=self._window)).append(seconds)
+
+    def quantile(self, node: str, model: str, q: float) -> Optional[float]:
+        """The q-quantile of recent durations, or None until there are enough samples."""
+        with self._lock:
+            samples = sorted(self._samples.get((node, model), ()))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+latency_tracker = LatencyTracker()
+
+
+def hedge_delay(node: str, model: str) -> float:
+    """Seconds to wait before hedging: the recent p95 (LLM_HEDGE_QUANTILE) of this node's calls to this model."""
+    observed = latency_tracker.quantile(node, model, get_llm_hedge_quantile())
+    return observed if observed is not None else get_llm_hedge_delay()
+
+
+async def hedged_ainvoke(
+    llm: BaseChatModel,
+    prompt: List[BaseMessage],
+    node: str,
+    model: str,
+    deadline: float,
+    hedge: bool = False,
+    config: Optional[Dict[str, Any]] = None
+) -> BaseMessage:
+    """
+    Call the model within `deadline` seconds.
+
+    With hedge, a duplicate request is sent if the first hasn't answered after
+    the usual (p95) latency; whichever answers first wins and the other is
+    cancelled. Only hedge calls whose output isn't streamed to the client.
+
+    One latency is recorded per call for the hedging delay, timed from the
+    first request: until the answer (so a hedge win counts the first
+    request's wait), or until the deadline cancelled it. Hedges are never
+    timed on their own; they only ran for part of the call.
+
+    Raises:
+        LLMDeadlineExceeded: If no request answers in time
+    """
+    loop = asyncio.get_running_loop()
+    expires = loop.time() + deadline
+
+    started: Dict[asyncio.Future, float] = {}
+
+    def attempt() -> asyncio.Future:
+        task = asyncio.ensure_future(llm.ainvoke(prompt, config=config))
+        started[task] = time.perf_counter()
+        return task
+
+    primary = attempt()
+    tasks = {primary}
+    answered = False
+    hedged = False
+    error: Optional[BaseException] = None
+    try:
+        if hedge:
+            delay = hedge_delay(node, model)
+            done, _ = await asyncio.wait(tasks, timeout=min(delay, deadline))
+            if not done:
+                logger.info(f"🔀 {node}: no answer from {model} after {delay:.2f}s, sending a hedged request")
+                tasks.add(attempt())
+                hedged = True
+
+        while tasks:
+            remaining = expires - loop.time()
+            if remaining <= 0:
+                break
+            done, _ = await asyncio.wait(tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                tasks.discard(task)
+                if task.exception() is None:
+                    latency_tracker.observe(node, model, time.perf_counter() - started[primary])
+                    answered = True
+                    if hedged:
+                        LLM_HEDGES.inc(node=node, winner="primary" if task is primary else "hedge")
+                    return task.result()
+                error = task.exception()
+
+        if error is not None and not tasks:
+            # Every request failed before the deadline
+            raise error
+        LLM_TIMEOUTS.inc(node=node)
+        logger.warning(f"⏱️ {node}: {model} didn't answer within {deadline:.1f}s")
+        raise LLMDeadlineExceeded(node, deadline)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if primary in tasks and not answered:
+            latency_tracker.observe(node, model, time.perf_counter() - started[primary])
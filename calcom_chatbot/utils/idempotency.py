@@ -0,0 +1,122 @@
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+from calcom_chatbot.utils.metrics import CACHE_LOOKUPS
+import asyncio
+import hashlib
+import time
+
+
+# How long a completed write is replayed for the same key
+IDEMPOTENCY_TTL_SECONDS = 600
+
+# Session id of clients that don't send one; shared by all of them, so it can't scope writes
+DEFAULT_SESSION_ID = "default"
+
+
+def idempotency_key(*parts: Optional[str]) -> str:
+    """Stable key for a write from its identifying parts (session/client key, time, attendee...)."""
+    normalized = "|".join((part or "").strip().lower() for part in parts)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def idempotency_scope(client_key: Optional[str], session_id: Optional[str]) -> Optional[str]:
+    """Whose repeats count as the same write: the client key, else a client-chosen session; None disables deduplication."""
+    if client_key:
+        return client_key
+    if session_id and session_id != DEFAULT_SESSION_ID:
+        return session_id
+    return None
+
+
+class IdempotencyCache:
+    """
+    Deduplicates writes by key.
+
+    A completed result is replayed for IDEMPOTENCY_TTL_SECONDS; a call made
+    while the same key is still in flight awaits the first call instead of
+    repeating it. Failures are not cached, so a failed write can be retried.
+    Results are linked to the bookings they touched and dropped once one of
+    those is cancelled or moved, so a repeat then writes again.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS):
+        self.ttl = ttl
+        self._results: Dict[str, Tuple[float, Any]] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._keys_by_uid: Dict[str, Set[str]] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        """Completed result for a key, or None if missing/expired."""
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._results[key]
+            return None
+        return result
+
+    def seen(self, key: str) -> bool:
+        """Whether a write with this key has completed recently or is in flight."""
+        return key in self._in_flight or self.get(key) is not None
+
+    def forget(self, booking_uid: str):
+        """Stop replaying writes that touched a booking (it was cancelled or rescheduled)."""
+        for key in self._keys_by_uid.pop(booking_uid, ()):
+            self._results.pop(key, None)
+
+    async def run(
+        self,
+        key: str,
+        write: Callable[[], Awaitable[Any]],
+        uids: Optional[Callable[[Any], Iterable[str]]] = None
+    ) -> Any:
+        """
+        Run write() once per key, replaying or joining earlier calls.
+
+        uids(result) names the bookings a completed write touched; the result
+        is replayed only until one of them is forgotten.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            CACHE_LOOKUPS.inc(cache="idempotency", result="hit")
+            return cached
+
+        pending = self._in_flight.get(key)
+        CACHE_LOOKUPS.inc(cache="idempotency", result="miss" if pending is None else "hit")
+        if pending is not None:
+            # Shielded so a cancelled duplicate doesn't cancel the original write
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await write()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved; only joined duplicates re-raise it
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            self._expire()
+            self._results[key] = (time.monotonic(), result)
+            for uid in (uids(result) if uids else ()):
+                self._keys_by_uid.setdefault(uid, set()).add(key)
+            future.set_result(result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, (stored_at, _) in self._results.items() if now - stored_at > self.ttl]:
+            del self._results[key]
+        for uid in list(self._keys_by_uid):
+            self._keys_by_uid[uid] &= self._results.keys()
+            if not self._keys_by_uid[uid]:
+                del self._keys_by_uid[uid]
+
+
+# Process-wide cache for booking writes
+idempotency_cache = IdempotencyCache()
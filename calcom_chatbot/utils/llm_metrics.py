@@ -0,0 +1,96 @@
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from calcom_chatbot.utils.metrics import LLM_COST, LLM_LATENCY, LLM_TOKENS
+from calcom_chatbot.utils.model_router import model_cost, record_spend
+from calcom_chatbot.utils.profiler import open_span, close_span
+from calcom_chatbot.utils.prompt_stats import prompt_stats
+import time
+
+
+def token_usage(response: LLMResult) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """(prompt, completion, cached prompt) tokens of a call, from the provider usage or, for streamed calls, the message."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+        return usage.get("prompt_tokens"), usage.get("completion_tokens"), cached
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                cached = (metadata.get("input_token_details") or {}).get("cache_read")
+                return metadata.get("input_tokens"), metadata.get("output_tokens"), cached
+    return None, None, None
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    Records LLM latency, token usage (including provider-cached prompt
+    tokens) and estimated cost by model and graph node (and, for profiled
+    requests, one span per call with the prompt size). The cost also counts
+    against the running turn's budget.
+
+    Pass it in the graph config (config={"callbacks": [llm_metrics_handler]});
+    LangChain propagates it to every llm.invoke made inside the nodes.
+    """
+
+    def __init__(self):
+        self._runs: Dict[UUID, tuple] = {}
+
+    def _start(self, run_id: UUID, kwargs: Dict[str, Any], metadata: Optional[Dict[str, Any]], prompt_chars: int):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or "unknown"
+        node = (metadata or {}).get("langgraph_node", "unknown")
+        profile_span = open_span("llm", "llm", model=model, node=node, prompt_chars=prompt_chars)
+        self._runs[run_id] = (time.perf_counter(), model, node, profile_span)
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[Any]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ):
+        self._start(run_id, kwargs, metadata, sum(len(str(m.content)) for batch in messages for m in batch))
+
+    def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ):
+        self._start(run_id, kwargs, metadata, sum(len(p) for p in prompts))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        started = self._runs.pop(run_id, None)
+        if started is None:
+            return
+        start, model, node, profile_span = started
+        LLM_LATENCY.observe(time.perf_counter() - start, model=model, node=node)
+
+        prompt_tokens, completion_tokens, cached_tokens = token_usage(response)
+        for kind, count in (("prompt", prompt_tokens), ("completion", completion_tokens), ("cached", cached_tokens)):
+            if count:
+                LLM_TOKENS.inc(count, model=model, node=node, kind=kind)
+        if prompt_tokens:
+            prompt_stats.record_usage(node, prompt_tokens, cached_tokens or 0)
+        cost = model_cost(model, prompt_tokens or 0, completion_tokens or 0)
+        if cost:
+            LLM_COST.inc(cost, model=model, node=node)
+            record_spend(cost)
+        close_span(profile_span, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, cached_tokens=cached_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        started = self._runs.pop(run_id, None)
+        if started is not None:
+            close_span(started[3], error=str(error))
+
+
+# Shared handler passed to every graph run
+llm_metrics_handler = LLMMetricsHandler()
@@ -0,0 +1,152 @@
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from calcom_chatbot.utils.config import (
+    get_log_level,
+    get_log_levels,
+    get_log_format,
+    get_log_body_max_chars,
+    get_log_body_sample_rate
+)
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+
+
+# Patterns masked in every log line before it is written
+_EMAIL_RE = re.compile(r"\b([A-Za-z0-9._%+-])[A-Za-z0-9._%+-]*@([A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*)")
+_BEARER_RE = re.compile(r"(Bearer\s+)[A-Za-z0-9._~+/=-]+", re.IGNORECASE)
+_API_KEY_RE = re.compile(r"\b(cal_(?:live|test)_|sk-(?:proj-)?)[A-Za-z0-9_-]{8,}")
+# International format only, so IDs, timestamps and floats are left alone
+_PHONE_RE = re.compile(r"\+\d[\d\s().-]{7,}\d")
+
+_listener: Optional[QueueListener] = None
+_body_max_chars = 500
+_body_sample_rate = 1.0
+
+
+def redact(text: str) -> str:
+    """Mask emails (keeping the first letter and domain), bearer tokens, API keys and phone numbers."""
+    text = _EMAIL_RE.sub(r"\1***@\2", text)
+    text = _BEARER_RE.sub(r"\1[REDACTED]", text)
+    text = _API_KEY_RE.sub(r"\1[REDACTED]", text)
+    return _PHONE_RE.sub("[PHONE]", text)
+
+
+def truncate(text: str, limit: Optional[int] = None) -> str:
+    """Cut a body to LOG_BODY_MAX_CHARS, noting how much was dropped."""
+    limit = limit if limit is not None else _body_max_chars
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}… (+{len(text) - limit} chars)"
+
+
+class _Body:
+    """Log argument that redacts and truncates a body only when the writer thread formats it."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __str__(self) -> str:
+        # Redact before truncating so a cut can't hide part of an email from the patterns
+        return truncate(redact(self.text))
+
+
+def sample_body(text: str) -> Optional[_Body]:
+    """
+    Body to pass as a log argument, or None when this body isn't sampled.
+
+    Keeps request/response logging cheap under load: only LOG_BODY_SAMPLE_RATE
+    of bodies are logged, none beyond LOG_BODY_MAX_CHARS, and the work is done
+    by the writer thread.
+    """
+    if _body_sample_rate < 1.0 and random.random() >= _body_sample_rate:
+        return None
+    return _Body(text)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with PII redacted from the message."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact(record.getMessage()),
+        }
+        if record.exc_info:
+            entry["exc"] = redact(self.formatException(record.exc_info))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RedactingFormatter(logging.Formatter):
+    """Plain-text formatter (LOG_FORMAT=text) that still redacts PII."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves message formatting to the writer thread.
+
+    The stock QueueHandler formats each record in the calling thread; here the
+    caller only enqueues, so %-formatting, redaction and JSON encoding happen
+    off the event loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    """Parse "module=LEVEL,module2=LEVEL" (LOG_LEVELS)."""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """
+    Configure process-wide logging once (idempotent).
+
+    Records go through a queue to a background writer thread. Settings come
+    from the environment: LOG_LEVEL, LOG_LEVELS (per-module overrides),
+    LOG_FORMAT (json or text), LOG_BODY_MAX_CHARS and LOG_BODY_SAMPLE_RATE.
+    """
+    global _listener, _body_max_chars, _body_sample_rate
+    if _listener is not None:
+        return
+
+    _body_max_chars = get_log_body_max_chars()
+    _body_sample_rate = get_log_body_sample_rate()
+
+    stream = logging.StreamHandler()
+    if get_log_format() == "text":
+        stream.setFormatter(RedactingFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        stream.setFormatter(JsonFormatter())
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(get_log_level())
+
+    for name, level in _parse_levels(get_log_levels()).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
@@ -0,0 +1,130 @@
+from collections import deque
+from typing import Any, Dict, List, Optional
+from calcom_chatbot.utils.metrics import LOOP_LAG, LOOP_LAG_QUANTILES, LOOP_STALLS
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+# How often the event loop's scheduling delay is sampled
+LOOP_LAG_SAMPLE_INTERVAL = 0.1
+
+# Number of recent samples used for lag percentiles
+LOOP_LAG_WINDOW = 3000
+
+# Number of recent stalls (with stacks) kept for /debug/loop
+STALL_HISTORY = 20
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _quantile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop scheduling delay and reports what blocks the loop.
+
+    An async sampler sleeps for a fixed interval and records how late it woke
+    up. A watchdog thread checks the sampler's heartbeat: when the loop has
+    been held longer than the threshold, it captures the loop thread's stack
+    (i.e. the blocking callback, caught in the act) and logs it.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_SAMPLE_INTERVAL, threshold: float = 0.25):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples: deque = deque(maxlen=LOOP_LAG_WINDOW)
+        self.stalls: deque = deque(maxlen=STALL_HISTORY)
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.perf_counter()
+        self._reported_beat: Optional[float] = None
+
+    def start(self, threshold: Optional[float] = None):
+        """Start sampling on the running loop and the watchdog thread (idempotent)."""
+        if threshold is not None:
+            self.threshold = threshold
+        if self._task is None or self._task.done():
+            self._loop_thread_id = threading.get_ident()
+            self._last_beat = time.perf_counter()
+            self._task = asyncio.create_task(self._run())
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._stopped.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self):
+        """Cancel the sampler and stop the watchdog."""
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            scheduled = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            # Anything past the requested sleep was spent waiting for a blocked loop
+            lag = max(0.0, now - scheduled - self.interval)
+            if self._reported_beat == self._last_beat and self.stalls:
+                # The stall the watchdog caught is over; record how long it really lasted
+                self.stalls[-1]["held_seconds"] = round(lag, 3)
+            self._last_beat = now
+            self.samples.append(lag)
+            LOOP_LAG.observe(lag)
+
+    def _watch(self):
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._last_beat
+            held = time.perf_counter() - beat - self.interval
+            if held < self.threshold or beat == self._reported_beat:
+                continue
+            # Report each stall once, with the stack of whatever holds the loop now
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(loop thread not found)"
+            self.stalls.append({"at": time.time(), "held_seconds": round(held, 3), "stack": stack})
+            LOOP_STALLS.inc()
+            logger.warning(f"🐢 Event loop blocked for {held * 1000:.0f}ms+, current stack:\n{stack}")
+
+    def percentiles(self) -> Dict[str, float]:
+        """Lag percentiles (seconds) over the recent sample window."""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {}
+        result = {f"p{int(q * 100)}": _quantile(ordered, q) for q in QUANTILES}
+        result["max"] = ordered[-1]
+        return result
+
+    def export(self):
+        """Publish current percentiles to the quantile gauge (called at scrape time)."""
+        ordered = sorted(self.samples)
+        if ordered:
+            for q in QUANTILES:
+                LOOP_LAG_QUANTILES.set(_quantile(ordered, q), quantile=str(q))
+
+    def report(self) -> Dict[str, Any]:
+        """Percentiles plus recent stalls with their stacks."""
+        recent: List[Dict[str, Any]] = list(self.stalls)
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "samples": len(self.samples),
+            "percentiles_ms": {k: round(v * 1000, 2) for k, v in self.percentiles().items()},
+            "stalls": recent[::-1],
+        }
+
+
+loop_lag_monitor = LoopLagMonitor()
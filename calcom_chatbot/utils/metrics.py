@@ -0,0 +1,221 @@
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+import threading
+
+
+# Latency buckets in seconds, from cache hits (ms) to slow LLM calls (tens of seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Metric:
+    """Base for labelled metrics; one series per label-value tuple."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}" for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}" for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observations (latencies)."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: [count per bucket (non-cumulative, last is +Inf)], sum, count
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0])
+            series[0][index] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), list(totals))) for key, (counts, totals) in self._series.items())
+        lines = self._header()
+        for key, (counts, (total, count)) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{"+Inf" if bound == float("inf") else repr(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {repr(float(total))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+NODE_LATENCY = registry.register(Histogram(
+    "calcom_chatbot_node_duration_seconds", "Graph node execution time", ["node"]
+))
+LLM_LATENCY = registry.register(Histogram(
+    "calcom_chatbot_llm_duration_seconds", "LLM call latency", ["model", "node"]
+))
+LLM_TOKENS = registry.register(Counter(
+    "calcom_chatbot_llm_tokens_total", "LLM tokens used", ["model", "node", "kind"]
+))
+CALCOM_LATENCY = registry.register(Histogram(
+    "calcom_chatbot_calcom_request_duration_seconds", "Cal.com API request latency", ["method", "endpoint"]
+))
+CALCOM_REQUESTS = registry.register(Counter(
+    "calcom_chatbot_calcom_requests_total", "Cal.com API requests by response status (\"error\" when no response arrived)", ["method", "endpoint", "status"]
+))
+CACHE_LOOKUPS = registry.register(Counter(
+    "calcom_chatbot_cache_lookups_total", "Cache lookups by cache and result (hit/miss)", ["cache", "result"]
+))
+ACTIVE_SESSIONS = registry.register(Gauge(
+    "calcom_chatbot_active_sessions", "Conversation sessions currently held in memory"
+))
+LOOP_LAG = registry.register(Histogram(
+    "calcom_chatbot_event_loop_lag_seconds", "Event loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+))
+LOOP_LAG_QUANTILES = registry.register(Gauge(
+    "calcom_chatbot_event_loop_lag_quantile_seconds", "Recent event loop lag percentiles", ["quantile"]
+))
+LOOP_STALLS = registry.register(Counter(
+    "calcom_chatbot_event_loop_stalls_total", "Times a callback held the event loop past the blocking threshold"
+))
+ADMISSION_IN_FLIGHT = registry.register(Gauge(
+    "calcom_chatbot_turns_in_flight", "Chat turns currently running the graph"
+))
+ADMISSION_QUEUED = registry.register(Gauge(
+    "calcom_chatbot_turns_queued", "Chat turns waiting for a free slot"
+))
+ADMISSION_REJECTED = registry.register(Counter(
+    "calcom_chatbot_turns_rejected_total", "Chat turns shed by admission control", ["reason"]
+))
+CLASSIFIER_BATCH_SIZE = registry.register(Histogram(
+    "calcom_chatbot_classifier_batch_size", "Messages classified per LLM call when classifier batching is on",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+))
+PROMPT_TOKENS = registry.register(Histogram(
+    "calcom_chatbot_prompt_tokens", "Assembled prompt size per template", ["template"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000)
+))
+PROMPT_TRIMS = registry.register(Counter(
+    "calcom_chatbot_prompt_trims_total", "Prompt sections trimmed to fit the token budget", ["template", "section"]
+))
+LLM_COST = registry.register(Counter(
+    "calcom_chatbot_llm_cost_usd_total", "Estimated LLM spend in USD", ["model", "node"]
+))
+MODEL_ROUTES = registry.register(Counter(
+    "calcom_chatbot_model_routes_total", "LLM calls by node, model tier and routing reason (default/escalated/downgraded)", ["node", "tier", "reason"]
+))
+LLM_HEDGES = registry.register(Counter(
+    "calcom_chatbot_llm_hedges_total", "Hedged LLM calls by node and which request answered first (primary/hedge)", ["node", "winner"]
+))
+LLM_TIMEOUTS = registry.register(Counter(
+    "calcom_chatbot_llm_timeouts_total", "LLM calls that missed their deadline", ["node"]
+))
@@ -0,0 +1,59 @@
+from typing import Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+import asyncio
+import contextvars
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Groups concurrent requests into one call.
+
+    Items submitted within max_wait seconds of the first one (or until
+    max_size items are waiting) are passed together to process(), which
+    returns one result per item, in order. Each submitter gets its own
+    result, or the exception if the whole batch failed.
+    """
+
+    def __init__(self, process: Callable[[List[T]], Awaitable[List[R]]], max_size: int, max_wait: float):
+        self.process = process
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        # Fresh context so the shared call isn't traced or streamed as part of one caller's run
+        task = asyncio.get_running_loop().create_task(self._run(batch), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]):
+        try:
+            results = await self.process([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,199 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from langchain_core.messages import BaseMessage
+from langchain_openai import ChatOpenAI
+from calcom_chatbot.utils.config import (
+    get_openai_api_key,
+    get_llm_call_timeout,
+    get_llm_hedging,
+    get_model_tier_names,
+    get_node_model_tiers,
+    get_turn_latency_budget,
+    get_turn_cost_budget
+)
+from calcom_chatbot.utils.hedging import hedged_ainvoke
+from calcom_chatbot.utils.metrics import MODEL_ROUTES
+from calcom_chatbot.utils.streaming import FINAL_ANSWER_TAG
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Weakest to strongest; escalation moves one step right, downgrades one step left
+TIERS = ["fast", "standard", "strong"]
+
+# Tier per LLM call site unless NODE_MODEL_TIERS overrides it
+DEFAULT_NODE_TIERS = {
+    "classifier": "fast",
+    "book_meeting": "fast",
+    "cancel_meeting": "fast",
+    "reschedule_meeting": "fast",
+    "get_slots": "fast",
+    "orchestrator_planner": "strong",
+    "orchestrator_solver": "standard",
+    "response": "standard",
+}
+FALLBACK_TIER = "standard"
+
+# USD per million (prompt, completion) tokens, for the per-turn cost budget
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+}
+
+# Fraction of the latency or cost budget after which calls are downgraded and never escalated
+NEARLY_SPENT = 0.75
+
+# Shortest deadline given to a call, even once the turn's latency budget is used up
+MIN_CALL_SECONDS = 2.0
+
+
+class TurnBudget:
+    """Latency and LLM spend of one graph turn, checked before each LLM call."""
+
+    def __init__(self, latency_seconds: float, cost_usd: float):
+        self.latency_seconds = latency_seconds
+        self.cost_usd = cost_usd
+        self.started = time.monotonic()
+        self.spent_usd = 0.0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining_seconds(self) -> float:
+        return self.latency_seconds - self.elapsed()
+
+    def nearly_spent(self) -> bool:
+        return (
+            self.elapsed() >= self.latency_seconds * NEARLY_SPENT
+            or self.spent_usd >= self.cost_usd * NEARLY_SPENT
+        )
+
+
+# Budget of the turn being run; None outside a turn (e.g. batched classification)
+_turn_budget: ContextVar[Optional[TurnBudget]] = ContextVar("turn_budget", default=None)
+
+
+@contextmanager
+def turn_budget() -> Iterator[TurnBudget]:
+    """Track latency and LLM spend for everything run inside the block (one graph turn)."""
+    budget = TurnBudget(get_turn_latency_budget(), get_turn_cost_budget())
+    token = _turn_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _turn_budget.reset(token)
+
+
+def model_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost of one call; 0 for models without a known price."""
+    # Longest prefix first so dated names (gpt-4o-mini-2024-07-18) match their family
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            prompt_price, completion_price = MODEL_PRICES[name]
+            return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+    return 0.0
+
+
+def record_spend(cost: float):
+    """Add an LLM call's cost to the current turn's budget."""
+    budget = _turn_budget.get()
+    if budget is not None:
+        budget.spent_usd += cost
+
+
+def call_deadline(final: bool = False) -> float:
+    """
+    Seconds the next LLM call may take: LLM_CALL_TIMEOUT_SECONDS, capped by what's left of the turn's latency budget.
+
+    A final-answer call (final) always gets the full LLM_CALL_TIMEOUT_SECONDS:
+    it runs after the turn's writes, so cutting it short would hide their results.
+    """
+    timeout = get_llm_call_timeout()
+    budget = _turn_budget.get()
+    if budget is None or final:
+        return timeout
+    return max(MIN_CALL_SECONDS, min(timeout, budget.remaining_seconds()))
+
+
+def node_tier(node: str) -> str:
+    tiers = {**DEFAULT_NODE_TIERS, **get_node_model_tiers()}
+    return tiers.get(node, FALLBACK_TIER)
+
+
+def select_tier(node: str) -> str:
+    """Tier for a node's first call: its configured tier, one step down when the turn budget is nearly spent."""
+    tier = node_tier(node)
+    budget = _turn_budget.get()
+    if budget is not None and budget.nearly_spent() and TIERS.index(tier) > 0:
+        downgraded = TIERS[TIERS.index(tier) - 1]
+        logger.info(f"⬇️ {node}: turn budget nearly spent ({budget.elapsed():.1f}s, ${budget.spent_usd:.3f}), using {downgraded} instead of {tier}")
+        MODEL_ROUTES.inc(node=node, tier=downgraded, reason="downgraded")
+        return downgraded
+    MODEL_ROUTES.inc(node=node, tier=tier, reason="default")
+    return tier
+
+
+def escalation_tier(node: str, tier: str) -> Optional[str]:
+    """Next stronger tier to retry with, or None at the top tier or when the turn budget is nearly spent."""
+    budget = _turn_budget.get()
+    if TIERS.index(tier) == len(TIERS) - 1 or (budget is not None and budget.nearly_spent()):
+        return None
+    stronger = TIERS[TIERS.index(tier) + 1]
+    logger.info(f"⬆️ {node}: escalating from {tier} to {stronger}")
+    MODEL_ROUTES.inc(node=node, tier=stronger, reason="escalated")
+    return stronger
+
+
+@lru_cache(maxsize=16)
+def _chat_model(model: str, temperature: float) -> ChatOpenAI:
+    return ChatOpenAI(
+        api_key=get_openai_api_key(),
+        model=model,
+        temperature=temperature
+    )
+
+
+def get_llm(tier: str, temperature: float = 0) -> ChatOpenAI:
+    """Shared chat model for a tier (models per tier come from MODEL_FAST/MODEL_STANDARD/MODEL_STRONG)."""
+    return _chat_model(get_model_tier_names()[tier], temperature)
+
+
+async def ainvoke_routed(
+    node: str,
+    prompt: List[BaseMessage],
+    accept: Optional[Callable[[str], bool]] = None,
+    temperature: float = 0,
+    config: Optional[Dict[str, Any]] = None,
+    tier: Optional[str] = None,
+    hedge: bool = False
+) -> BaseMessage:
+    """
+    Call the model routed for a node.
+
+    When accept rejects the reply text (unparseable or low confidence), the
+    call is retried one tier up, as long as the turn budget allows. tier
+    starts the call at a given tier instead of the node's. Each call is
+    bounded by call_deadline() (final-answer calls, tagged FINAL_ANSWER_TAG,
+    by LLM_CALL_TIMEOUT_SECONDS alone); with hedge (and LLM_HEDGING on), a slow call
+    gets a duplicate request (see hedged_ainvoke).
+
+    Raises:
+        LLMDeadlineExceeded: If a call misses its deadline
+    """
+    tier = tier or select_tier(node)
+    hedge = hedge and get_llm_hedging()
+    final = FINAL_ANSWER_TAG in ((config or {}).get("tags") or [])
+    while True:
+        model = get_model_tier_names()[tier]
+        response = await hedged_ainvoke(get_llm(tier, temperature), prompt, node, model, call_deadline(final), hedge, config)
+        if accept is None or accept(response.content.strip()):
+            return response
+        stronger = escalation_tier(node, tier)
+        if stronger is None:
+            return response
+        tier = stronger
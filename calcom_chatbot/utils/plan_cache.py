@@ -0,0 +1,180 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from calcom_chatbot.utils.config import get_default_timezone, get_plan_cache_size
+from calcom_chatbot.utils.date_resolver import find_date_spans, find_time_spans, find_timezone, WEEKDAYS, MONTHS
+from calcom_chatbot.utils.metrics import CACHE_LOOKUPS
+import re
+import time
+
+
+# How long a plan template is reused (prompt or action changes ship with a restart anyway)
+PLAN_CACHE_TTL_SECONDS = 24 * 3600
+
+_EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]*\w')
+_NAME_RE = re.compile(r"\bwith\s+([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)*)")
+_NAME_WORD_RE = re.compile(r"[A-Z][\w'-]*")
+# Capitalized words after "with" that are part of a date, not a name
+_NAME_STOPWORDS = {"today", "tomorrow", "tonight", "next", "this"} | set(WEEKDAYS) | set(MONTHS)
+
+_PLACEHOLDER_RE = re.compile(r"\{(?:DATE|TIME|EMAIL|NAME)\d+\}")
+# Dates, times and emails in a plan must come from the message; as constants they'd go stale or leak into other plans
+_LITERAL_RE = re.compile(r"\d{4}-\d{2}-\d{2}|\b\d{1,2}:\d{2}\b|[\w.+-]+@[\w-]+\.[\w.-]*\w")
+
+
+class LiftedQuery(NamedTuple):
+    """A message with its dates, times, emails and names replaced by placeholders."""
+    shape: str               # e.g. "cancel all my meetings {DATE1}, i'm sick"
+    values: Dict[str, str]   # placeholder -> value as it appears in plans ("{DATE1}" -> "2025-10-29")
+
+
+def _name_spans(query: str) -> List[Tuple[int, int, str]]:
+    spans = []
+    for match in _NAME_RE.finditer(query):
+        end = None
+        for word in _NAME_WORD_RE.finditer(match.group(1)):
+            if word.group(0).lower() in _NAME_STOPWORDS:
+                break
+            end = word.end()
+        if end is not None:
+            spans.append((match.start(1), match.start(1) + end, query[match.start(1):match.start(1) + end]))
+    return spans
+
+
+def lift_parameters(query: str, now: Optional[datetime] = None) -> LiftedQuery:
+    """
+    Normalize a message into its request shape.
+
+    Dates ("tomorrow", "Oct 29") become YYYY-MM-DD values and times ("2pm")
+    HH:MM, as the planner writes them. Equal values share a placeholder, so
+    "tomorrow ... tomorrow" and "tomorrow ... friday" are different shapes.
+    Text outside the parameters is lowercased and otherwise kept verbatim.
+    """
+    tz = find_timezone(query, get_default_timezone())
+    today = (now or datetime.now(timezone.utc)).astimezone(tz).date()
+
+    spans: List[Tuple[int, int, str, str]] = []
+    spans += [(start, end, "DATE", value.isoformat()) for start, end, value in find_date_spans(query, today)]
+    spans += [(start, end, "TIME", value.strftime("%H:%M")) for start, end, value in find_time_spans(query)]
+    spans += [(match.start(), match.end(), "EMAIL", match.group(0)) for match in _EMAIL_RE.finditer(query)]
+    spans += [(start, end, "NAME", name) for start, end, name in _name_spans(query)]
+    spans.sort(key=lambda span: (span[0], -span[1]))
+
+    pieces, values, placeholders, counts = [], {}, {}, {}
+    position = 0
+    for start, end, kind, value in spans:
+        if start < position:
+            # Overlaps an earlier parameter
+            continue
+        key = (kind, value.lower())
+        if key not in placeholders:
+            counts[kind] = counts.get(kind, 0) + 1
+            placeholders[key] = f"{{{kind}{counts[kind]}}}"
+            values[placeholders[key]] = value
+        before = query[position:start].lower()
+        if kind == "DATE":
+            # "on friday" and "tomorrow" are the same shape
+            before = re.sub(r"\b(?:on|for)\s+$", "", before)
+        pieces.append(before)
+        pieces.append(placeholders[key])
+        position = end
+    pieces.append(query[position:].lower())
+
+    shape = re.sub(r"\s+", " ", "".join(pieces)).strip().rstrip(".!")
+    return LiftedQuery(shape, values)
+
+
+def to_template(tasks: List[Dict[str, Any]], lifted: LiftedQuery) -> Optional[List[Dict[str, Any]]]:
+    """
+    Replace a plan's parameter values with the message's placeholders.
+
+    Returns None when the plan can't be reused for other messages of the same
+    shape: a value that isn't a placeholder, a #E reference or text from the
+    message itself (the planner took it from the conversation history or chose
+    it, e.g. a date or time).
+    """
+    shape = lifted.shape.lower()
+    # Longest first so "Alice Smith" is replaced before "Alice"
+    replacements = sorted(lifted.values.items(), key=lambda item: len(item[1]), reverse=True)
+    template = []
+    for task in tasks:
+        params = {}
+        for name, value in task["params"].items():
+            if value.startswith("#E"):
+                params[name] = value
+                continue
+            templated = value
+            for placeholder, original in replacements:
+                templated = re.sub(rf"(?<!\w){re.escape(original)}(?!\w)", placeholder, templated, flags=re.IGNORECASE)
+            if _LITERAL_RE.search(_PLACEHOLDER_RE.sub("", templated)) or templated.lower() not in shape:
+                return None
+            params[name] = templated
+        template.append({"action": task["action"], "params": params})
+    return template
+
+
+def fill_template(template: List[Dict[str, Any]], values: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Plan for a new message of the same shape."""
+    return [
+        {
+            "action": task["action"],
+            "params": {
+                name: _PLACEHOLDER_RE.sub(lambda match: values.get(match.group(0), match.group(0)), value)
+                for name, value in task["params"].items()
+            },
+        }
+        for task in template
+    ]
+
+
+class PlanCache:
+    """
+    LRU cache of orchestrator plan templates keyed by request shape.
+
+    A message like "cancel all my meetings tomorrow, I'm sick" is stored as
+    the shape "cancel all my meetings {DATE1}, i'm sick" with its plan
+    templated the same way; "Cancel all my meetings on Friday, I'm sick" then
+    gets that plan with Friday's date, without a planner call.
+    """
+
+    def __init__(self, max_size: int, ttl: float = PLAN_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+
+    def get(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """Plan for a message from a cached template, or None."""
+        if self.max_size <= 0:
+            return None
+        lifted = lift_parameters(query)
+        entry = self._entries.get(lifted.shape)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._entries[lifted.shape]
+            entry = None
+        CACHE_LOOKUPS.inc(cache="plans", result="miss" if entry is None else "hit")
+        if entry is None:
+            return None
+        self._entries.move_to_end(lifted.shape)
+        return fill_template(entry[1], lifted.values)
+
+    def put(self, query: str, tasks: List[Dict[str, Any]]) -> bool:
+        """Store a validated plan as a template for the message's shape; False if it isn't reusable."""
+        if self.max_size <= 0:
+            return False
+        lifted = lift_parameters(query)
+        template = to_template(tasks, lifted)
+        if template is None:
+            return False
+        self._entries[lifted.shape] = (time.monotonic(), template)
+        self._entries.move_to_end(lifted.shape)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return True
+
+    def clear(self):
+        """Drop every template."""
+        self._entries.clear()
+
+
+# Process-wide cache, used by the orchestrator
+plan_cache = PlanCache(get_plan_cache_size())
@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+import time
+import uuid
+
+
+# How many finished profiles are kept for GET /profiles/{id}
+PROFILE_STORE_SIZE = 100
+
+
+class Span:
+    """One timed step of a profiled request (node, LLM call, Cal.com call, orchestrator task)."""
+
+    def __init__(self, name: str, kind: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs
+        self.children: List["Span"] = []
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def finish(self, **attrs: Any):
+        self.attrs.update(attrs)
+        self.duration = time.perf_counter() - self.start
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "start_ms": round((self.start - origin) * 1000, 2),
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "attrs": self.attrs,
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+
+# Innermost open span of the current request; None when the request isn't profiled
+_current_span: ContextVar[Optional[Span]] = ContextVar("profile_span", default=None)
+
+
+def open_span(name: str, kind: str, **attrs: Any) -> Optional[Span]:
+    """
+    Start a leaf span under the current one (for start/end callbacks).
+
+    Returns None when the request isn't profiled; pass the result to close_span.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    child = Span(name, kind, attrs)
+    parent.children.append(child)
+    return child
+
+
+def close_span(span: Optional[Span], **attrs: Any):
+    if span is not None:
+        span.finish(**attrs)
+
+
+@contextmanager
+def span(name: str, kind: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    """Time a block as a span; spans opened inside it become its children."""
+    current = open_span(name, kind, **attrs)
+    if current is None:
+        yield None
+        return
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        _current_span.reset(token)
+        current.finish()
+
+
+@contextmanager
+def profiled(name: str) -> Iterator[Span]:
+    """Profile everything run inside the block under a new root span."""
+    root = Span(name, "request", {})
+    token = _current_span.set(root)
+    try:
+        yield root
+    finally:
+        _current_span.reset(token)
+        root.finish()
+
+
+def server_timing(root: Span) -> str:
+    """
+    Summarize a profile as a Server-Timing header.
+
+    One entry per graph node, plus total LLM and Cal.com time and the whole request.
+    """
+    entries = [
+        f"{child.name};dur={child.duration * 1000:.1f}"
+        for child in root.children if child.kind == "node" and child.duration is not None
+    ]
+    totals: Dict[str, float] = {"llm": 0.0, "calcom": 0.0}
+
+    def collect(node: Span):
+        for child in node.children:
+            if child.kind in totals and child.duration is not None:
+                totals[child.kind] += child.duration
+            collect(child)
+
+    collect(root)
+    entries += [f"{kind};dur={total * 1000:.1f}" for kind, total in totals.items()]
+    entries.append(f"total;dur={(root.duration or 0.0) * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class ProfileStore:
+    """Most recent finished profiles, by id."""
+
+    def __init__(self, size: int = PROFILE_STORE_SIZE):
+        self.size = size
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def add(self, root: Span, **attrs: Any) -> str:
+        profile_id = uuid.uuid4().hex[:12]
+        self._profiles[profile_id] = {"id": profile_id, **attrs, "spans": root.to_dict()}
+        while len(self._profiles) > self.size:
+            self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of stored profiles, newest first."""
+        return [
+            {key: value for key, value in profile.items() if key != "spans"}
+            | {"duration_ms": profile["spans"]["duration_ms"]}
+            for profile in reversed(self._profiles.values())
+        ]
+
+
+profile_store = ProfileStore()
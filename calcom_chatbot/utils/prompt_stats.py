@@ -0,0 +1,57 @@
+from typing import Any, Dict
+import threading
+
+
+class PromptStats:
+    """
+    Running prompt-size totals for GET /debug/prompts.
+
+    Per template: static prefix size, average assembled size and how often the
+    token budget forced trimming. Per node: prompt tokens reported by the
+    provider and how many of them were served from its prompt cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates: Dict[str, Dict[str, Any]] = {}
+        self._nodes: Dict[str, Dict[str, int]] = {}
+
+    def record_prompt(self, template: str, static_tokens: int, total_tokens: int, budget: int, trimmed: bool):
+        with self._lock:
+            entry = self._templates.setdefault(template, {"calls": 0, "tokens": 0, "trimmed": 0})
+            entry["calls"] += 1
+            entry["tokens"] += total_tokens
+            entry["trimmed"] += trimmed
+            entry["static_tokens"] = static_tokens
+            entry["budget"] = budget
+
+    def record_usage(self, node: str, prompt_tokens: int, cached_tokens: int):
+        with self._lock:
+            entry = self._nodes.setdefault(node, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["cached_tokens"] += cached_tokens
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            templates = {
+                name: {
+                    "calls": entry["calls"],
+                    "static_tokens": entry["static_tokens"],
+                    "avg_prompt_tokens": round(entry["tokens"] / entry["calls"]),
+                    "budget": entry["budget"],
+                    "trimmed": entry["trimmed"],
+                }
+                for name, entry in sorted(self._templates.items())
+            }
+            nodes = {
+                name: {
+                    **entry,
+                    "cached_ratio": round(entry["cached_tokens"] / entry["prompt_tokens"], 3) if entry["prompt_tokens"] else 0.0,
+                }
+                for name, entry in sorted(self._nodes.items())
+            }
+        return {"templates": templates, "nodes": nodes}
+
+
+prompt_stats = PromptStats()
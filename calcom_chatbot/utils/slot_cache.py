@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from calcom_chatbot.utils.booking_index import parse_time
+from calcom_chatbot.utils.metrics import CACHE_LOOKUPS
+import time
+
+
+# How long a /slots response is trusted
+SLOT_CACHE_TTL_SECONDS = 120
+
+# How many alternatives to suggest when a requested time is unavailable
+ALTERNATIVES_COUNT = 3
+
+
+class SlotUnavailableError(Exception):
+    """Raised before a write when cached availability shows the requested time is taken."""
+
+    def __init__(self, start_time: str, alternatives: List[str]):
+        self.start_time = start_time
+        self.alternatives = alternatives
+        message = f"{start_time} is not available."
+        if alternatives:
+            message += " Nearest available times: " + ", ".join(alternatives) + "."
+        else:
+            message += " There are no available times left on that day."
+        super().__init__(message)
+
+
+class SlotCache:
+    """TTL cache of /slots responses keyed by date (YYYY-MM-DD)."""
+
+    def __init__(self, ttl: float = SLOT_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def get(self, date: str, count: bool = True) -> Optional[Dict[str, Any]]:
+        """Return the cached response for a date, or None if missing/expired (count=False keeps it out of the hit rate)."""
+        entry = self._entries.get(date)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._entries[date]
+            entry = None
+        if count:
+            CACHE_LOOKUPS.inc(cache="slots", result="miss" if entry is None else "hit")
+        return entry[1] if entry else None
+
+    def put(self, date: str, result: Dict[str, Any]):
+        """Store a fresh /slots response for a date."""
+        self._entries[date] = (time.monotonic(), result)
+
+    def invalidate(self, date: str):
+        """Drop a date after a write changed its availability."""
+        self._entries.pop(date, None)
+
+    def clear(self):
+        """Drop every cached date."""
+        self._entries.clear()
+
+
+# Process-wide cache, filled by get_available_slots
+slot_cache = SlotCache()
+
+
+def _slot_starts(result: Dict[str, Any]) -> List[datetime]:
+    """Extract slot start times from a /slots response (range or plain format)."""
+    starts = []
+    for time_slots in (result.get("data") or {}).values():
+        for slot in time_slots or []:
+            start = parse_time(slot.get("start", "") if isinstance(slot, dict) else str(slot))
+            if start:
+                starts.append(start)
+    return sorted(starts)
+
+
+def validate_start_time(start_time: str):
+    """
+    Check a requested start time against cached availability before a write.
+
+    Does nothing when the day is not cached (Cal.com then decides).
+
+    Raises:
+        SlotUnavailableError: If the cached slots for that day don't include start_time
+    """
+    requested = parse_time(start_time)
+    if requested is None:
+        return
+
+    # Not a lookup on behalf of a caller: a miss here never triggers a fetch
+    cached = slot_cache.get(requested.date().isoformat(), count=False)
+    if cached is None:
+        return
+
+    starts = _slot_starts(cached)
+    if requested in starts:
+        return
+
+    nearest = sorted(starts, key=lambda start: abs(start - requested))[:ALTERNATIVES_COUNT]
+    raise SlotUnavailableError(
+        start_time,
+        [start.strftime("%H:%M") for start in sorted(nearest)]
+    )
@@ -0,0 +1,19 @@
+from typing import Any, Dict
+from langgraph.config import get_stream_writer
+
+
+# Tag for LLM calls whose output is the user-facing reply; their tokens are streamed to clients
+FINAL_ANSWER_TAG = "final_answer"
+
+
+def emit(event: Dict[str, Any]):
+    """
+    Send a progress event to consumers of the graph's "custom" stream.
+
+    No-op when the node runs outside a graph run (e.g. called directly).
+    """
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer(event)
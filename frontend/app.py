@@ -4,13 +4,43 @@ Simple, clean, and decoupled from backend
 """
 import chainlit as cl
 import httpx
+import json
 import os
 from datetime import datetime
+from typing import Optional
 import uuid
 
 # Backend API configuration
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8001")
 
+# No overall deadline: a streamed turn only times out if the backend goes quiet for READ_TIMEOUT seconds
+READ_TIMEOUT = float(os.getenv("READ_TIMEOUT", "60"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """One pooled client per process, reused by every chat."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=BACKEND_URL,
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=5.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+    return _client
+
+
+def describe_progress(event: dict) -> Optional[str]:
+    """Status line for a progress event, or None for events not shown."""
+    if event.get("type") == "plan":
+        return f"🗂️ Planned {len(event['tasks'])} steps..."
+    if event.get("type") == "task" and event.get("status") == "started":
+        return f"⏳ Step {event['index']}/{event['total']}: {event['action'].replace('_', ' ')}..."
+    if event.get("type") == "events_page":
+        return "📋 Fetching your events..."
+    return None
+
 
 @cl.on_chat_start
 async def start():
@@ -44,30 +74,63 @@ async def main(message: cl.Message):
     await msg.send()
     
     try:
-        # Call backend API
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{BACKEND_URL}/chat",
-                json={
-                    "message": message.content,
-                    "session_id": session_id
-                }
-            )
+        # Stream the turn from the backend
+        streamed = False
+        async with get_client().stream(
+            "POST",
+            "/chat/stream",
+            json={
+                "message": message.content,
+                "session_id": session_id
+            }
+        ) as response:
             response.raise_for_status()
-            data = response.json()
-            
-            # Get response and intent
-            bot_response = data.get("response", "Sorry, I couldn't process that.")
-            intent = data.get("intent", "general")
-            
-            # Add intent badge for debugging (optional)
-            if os.getenv("SHOW_INTENT") == "true":
-                bot_response = f"[Intent: {intent}]\n\n{bot_response}"
-            
-            # Update message with response
-            msg.content = bot_response
-            await msg.update()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                
+                if event["type"] == "token":
+                    # Reply text as the LLM writes it
+                    if not streamed:
+                        msg.content = ""
+                        streamed = True
+                    await msg.stream_token(event["text"])
+                
+                elif event["type"] == "final":
+                    # Get response and intent
+                    bot_response = event.get("response") or "Sorry, I couldn't process that."
+                    intent = event.get("intent", "general")
+                    
+                    # Add intent badge for debugging (optional)
+                    if os.getenv("SHOW_INTENT") == "true":
+                        bot_response = f"[Intent: {intent}]\n\n{bot_response}"
+                    
+                    # Update message with the complete response
+                    msg.content = bot_response
+                    await msg.update()
+                
+                elif event["type"] == "error":
+                    if event.get("retry_after"):
+                        msg.content = f"⏳ The assistant is busy, please try again in {event['retry_after']}s."
+                    else:
+                        msg.content = f"❌ An error occurred: {event.get('detail', 'unknown error')}"
+                    await msg.update()
+                
+                elif not streamed:
+                    # Orchestrator steps and other progress while the reply isn't ready
+                    status = describe_progress(event)
+                    if status:
+                        msg.content = status
+                        await msg.update()
             
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code in (429, 503):
+            retry_after = e.response.headers.get("Retry-After")
+            msg.content = f"⏳ The assistant is busy, please try again {f'in {retry_after}s' if retry_after else 'shortly'}."
+        else:
+            msg.content = f"❌ Error connecting to backend: {str(e)}"
+        await msg.update()
     except httpx.HTTPError as e:
         error_message = f"❌ Error connecting to backend: {str(e)}"
         msg.content = error_message
@@ -4,12 +4,68 @@ Simple, clean, and decoupled from backend
 """
 import streamlit as st
 import httpx
+import json
 import uuid
 from datetime import datetime
 
 # Backend API configuration
 BACKEND_URL = "http://localhost:8001"
 
+# No overall deadline: a streamed reply only times out if the backend goes quiet this long
+READ_TIMEOUT = 60.0
+
+# Messages rendered per page of history; older pages load on demand
+HISTORY_PAGE_SIZE = 20
+
+
+@st.cache_resource
+def get_client() -> httpx.Client:
+    """One pooled client shared by all reruns and browser sessions."""
+    return httpx.Client(base_url=BACKEND_URL, timeout=httpx.Timeout(READ_TIMEOUT, connect=5.0))
+
+
+def describe_progress(event: dict):
+    """Status line for a progress event, or None for events not shown."""
+    if event.get("type") == "plan":
+        return f"🗂️ Planned {len(event['tasks'])} steps..."
+    if event.get("type") == "task" and event.get("status") == "started":
+        return f"⏳ Step {event['index']}/{event['total']}: {event['action'].replace('_', ' ')}..."
+    return None
+
+
+def stream_reply(prompt: str, placeholder) -> str:
+    """Stream a turn from /chat/stream into the placeholder; returns the final reply."""
+    reply = ""
+    with get_client().stream(
+        "POST",
+        "/chat/stream",
+        json={
+            "message": prompt,
+            "session_id": st.session_state.session_id
+        }
+    ) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            
+            if event["type"] == "token":
+                reply += event["text"]
+                placeholder.markdown(reply + "▌")
+            elif event["type"] == "final":
+                reply = event.get("response") or "Sorry, I couldn't process that."
+            elif event["type"] == "error":
+                if event.get("retry_after"):
+                    return f"⏳ The assistant is busy, please try again in {event['retry_after']}s."
+                return f"❌ An error occurred: {event.get('detail', 'unknown error')}"
+            elif not reply:
+                status = describe_progress(event)
+                if status:
+                    placeholder.markdown(status)
+    return reply
+
+
 # Page configuration
 st.set_page_config(
     page_title="Cal.com Chatbot",
@@ -42,6 +98,9 @@ if "session_id" not in st.session_state:
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+if "history_pages" not in st.session_state:
+    st.session_state.history_pages = 1
+
 # Title and description
 st.title("📅 Cal.com Chatbot")
 st.caption("Book, list, cancel, and reschedule your meetings with natural language")
@@ -70,10 +129,18 @@ with st.sidebar:
     if st.button("🔄 New Session"):
         st.session_state.session_id = str(uuid.uuid4())
         st.session_state.messages = []
+        st.session_state.history_pages = 1
+        st.rerun()
+
+# Display the latest page(s) of chat messages, so reruns stay cheap in long conversations
+shown = HISTORY_PAGE_SIZE * st.session_state.history_pages
+hidden = len(st.session_state.messages) - shown
+if hidden > 0:
+    if st.button(f"⬆️ Show earlier messages ({hidden} hidden)"):
+        st.session_state.history_pages += 1
         st.rerun()
 
-# Display chat messages
-for message in st.session_state.messages:
+for message in st.session_state.messages[-shown:]:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
@@ -84,38 +151,33 @@ if prompt := st.chat_input("Type your message..."):
     with st.chat_message("user"):
         st.markdown(prompt)
     
-    # Get bot response
+    # Get bot response, streamed into the chat bubble
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                # Call backend API
-                response = httpx.post(
-                    f"{BACKEND_URL}/chat",
-                    json={
-                        "message": prompt,
-                        "session_id": st.session_state.session_id
-                    },
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                bot_response = data.get("response", "Sorry, I couldn't process that.")
-                
-                # Display response
-                st.markdown(bot_response)
-                
-                # Add to session state
-                st.session_state.messages.append({"role": "assistant", "content": bot_response})
-                
-            except httpx.HTTPError as e:
+        placeholder = st.empty()
+        placeholder.markdown("Thinking...")
+        try:
+            bot_response = stream_reply(prompt, placeholder)
+            placeholder.markdown(bot_response)
+            
+            # Add to session state
+            st.session_state.messages.append({"role": "assistant", "content": bot_response})
+            
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (429, 503):
+                retry_after = e.response.headers.get("Retry-After")
+                error_message = f"⏳ The assistant is busy, please try again {f'in {retry_after}s' if retry_after else 'shortly'}."
+            else:
                 error_message = f"❌ Error connecting to backend: {str(e)}"
-                st.error(error_message)
-                st.session_state.messages.append({"role": "assistant", "content": error_message})
-            except Exception as e:
-                error_message = f"❌ An error occurred: {str(e)}"
-                st.error(error_message)
-                st.session_state.messages.append({"role": "assistant", "content": error_message})
+            placeholder.error(error_message)
+            st.session_state.messages.append({"role": "assistant", "content": error_message})
+        except httpx.HTTPError as e:
+            error_message = f"❌ Error connecting to backend: {str(e)}"
+            placeholder.error(error_message)
+            st.session_state.messages.append({"role": "assistant", "content": error_message})
+        except Exception as e:
+            error_message = f"❌ An error occurred: {str(e)}"
+            placeholder.error(error_message)
+            st.session_state.messages.append({"role": "assistant", "content": error_message})
 
 # Footer
 st.divider()